@@ -0,0 +1,193 @@
+"""Asynchronous (ASGI) serving mode for the Traffic Sign Classifier.
+
+Under gunicorn's sync workers each worker is blocked for the whole duration of
+a request's Gemini calls, so two workers serve about two requests at a time.
+This app serves the same ``/predict`` and ``/predict_batch`` contracts from an
+event loop instead:
+
+- CPU-bound work (decoding, the CNN) runs in a small bounded thread pool
+  (``ASYNC_INFERENCE_THREADS``), so inference never oversubscribes the CPU;
+- Gemini calls are awaited on app.py's ``request_executor`` (``REQUEST_POOL_SIZE``
+  threads), so many requests can wait on the network at once without holding a
+  worker. An escalated request holds two of those threads while its verification
+  and speculative analysis run side by side.
+
+Every other route (``/``, ``/stats``, ``/ready``, static files) is served by the
+Flask app mounted underneath. The prediction logic itself is shared with app.py.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000 --workers 2
+"""
+import asyncio
+import functools
+import logging
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from starlette.applications import Starlette
+from starlette.datastructures import UploadFile
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as flask_app
+import config
+import preprocessing
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool for CPU-bound decoding and inference
+inference_executor = ThreadPoolExecutor(max_workers=config.ASYNC_INFERENCE_THREADS, thread_name_prefix='inference')
+
+
+async def run_inference(fn, *args):
+    """Run a CPU-bound function in the bounded inference pool."""
+    return await asyncio.get_running_loop().run_in_executor(inference_executor, functools.partial(fn, *args))
+
+
+async def run_gemini(fn, *args):
+    """Await a blocking Gemini call on app.request_executor (REQUEST_POOL_SIZE threads)."""
+    return await asyncio.get_running_loop().run_in_executor(flask_app.request_executor, functools.partial(fn, *args))
+
+
+async def resolve_escalated(image, cnn):
+    """Async twin of app.resolve_escalated: same calls, awaited instead of blocking a thread."""
+    gemini_task = asyncio.ensure_future(run_gemini(flask_app.get_gemini_prediction, image))
+    # Speculatively start the analysis for the CNN label, as the sync path does
+    analysis_future = flask_app.request_executor.submit(
+        flask_app.get_gemini_analysis, image, cnn['sign_name'], cnn['class_id'])
+
+    with flask_app.STAGE_SECONDS.time(stage='gemini_prediction'):
+        gemini_prediction = await gemini_task
+    with flask_app.STAGE_SECONDS.time(stage='comparison'):
+        comparison_result = flask_app.compare_predictions(cnn['sign_name'], cnn['confidence'], gemini_prediction)
+    final_sign = comparison_result['final_sign']
+    final_class = flask_app.final_class_id(comparison_result, cnn)
+    with flask_app.STAGE_SECONDS.time(stage='analysis'):
+        if final_sign == cnn['sign_name']:
+            ai_description = await asyncio.wrap_future(analysis_future)
+        else:
+            # Speculation missed: drop it and analyse the corrected sign instead
+            analysis_future.cancel()
+            ai_description = await run_gemini(flask_app.get_gemini_analysis, image, final_sign, final_class)
+    flask_app.escalation_policy.record_outcome(final_sign != cnn['sign_name'])
+    return comparison_result, final_class, ai_description, False
+
+
+async def process_image(image_file, use_cache=True, image_mode=None, top_k=0):
+    """Async twin of app.process_image for one uploaded image file (decoded from the spooled upload)."""
+    started = time.perf_counter()
+    try:
+        upload, cached_response = await run_inference(flask_app.prepare_image, image_file, use_cache,
+                                                       image_mode, top_k)
+        if cached_response is not None:
+            flask_app.REQUESTS.inc(endpoint='predict', outcome='cached')
+            return cached_response
+
+        cnn = await run_inference(flask_app.run_cnn, upload['image'], top_k)
+        decision = flask_app.escalation_policy.decide(cnn['probabilities'])
+        flask_app.log_escalation(decision)
+        if decision.escalate:
+            resolution = await resolve_escalated(upload['image'], cnn)
+        else:
+            resolution = await run_gemini(flask_app.resolve_confident, upload['image'], cnn)
+
+        # Let the image echo finish without blocking the loop; build_response then reads it at once
+        if upload['echo_future'] is not None:
+            await asyncio.wait([asyncio.wrap_future(upload['echo_future'])])
+        response = flask_app.build_response(upload, cnn, decision, resolution, top_k)
+        flask_app.STAGE_SECONDS.observe(time.perf_counter() - started, stage='total')
+        flask_app.REQUESTS.inc(endpoint='predict', outcome='success')
+        return response
+
+    except preprocessing.ImageRejected as e:
+        logger.info(f"Rejected upload: {e}")
+        flask_app.REQUESTS.inc(endpoint='predict', outcome='rejected')
+        return {'success': False, 'error': str(e)}
+    except Exception as e:
+        logger.exception(f"Error processing image: {e}")
+        flask_app.REQUESTS.inc(endpoint='predict', outcome='error')
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def request_values(request, form):
+    """Merge form fields and query parameters like Flask's request.values (query string wins)."""
+    values = {key: value for key, value in form.items() if isinstance(value, str)}
+    values.update(request.query_params)
+    return values
+
+
+class _Upload:
+    """Adapts a Starlette UploadFile to the (filename, stream) shape app.iter_uploaded_images expects."""
+
+    def __init__(self, upload):
+        self.filename = upload.filename
+        self.stream = upload.file
+
+
+def too_large(request):
+    """Whether the declared body size exceeds MAX_CONTENT_LENGTH (Flask enforces it for the WSGI routes)."""
+    length = request.headers.get('content-length', '')
+    return length.isdigit() and int(length) > config.MAX_CONTENT_LENGTH
+
+
+TOO_LARGE = {'success': False, 'error': 'Upload exceeds MAX_CONTENT_LENGTH'}
+
+
+async def predict(request):
+    if too_large(request):
+        return JSONResponse(TOO_LARGE, status_code=413)
+    form = await request.form()
+    file = form.get('file')
+    if not isinstance(file, UploadFile):
+        return JSONResponse({'success': False, 'error': 'No file uploaded'})
+    if not file.filename:
+        return JSONResponse({'success': False, 'error': 'No file selected'})
+    if preprocessing.sniff_format(file.file) is None:
+        return JSONResponse({'success': False, 'error': 'Invalid file type. Use PNG, JPG, or JPEG.'})
+
+    values = request_values(request, form)
+    try:
+        options = flask_app.get_predict_options(values)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)})
+    if flask_app.wants_stream(values):
+        # The NDJSON event generator is synchronous; Starlette iterates it in its thread pool
+        return StreamingResponse(flask_app.stream_prediction(BytesIO(await file.read()), **options),
+                                 media_type=flask_app.STREAM_MIMETYPE, headers=flask_app.STREAM_HEADERS)
+    return JSONResponse(await process_image(file.file, **options))
+
+
+async def predict_batch(request):
+    if too_large(request):
+        return JSONResponse(TOO_LARGE, status_code=413)
+    form = await request.form()
+    files = [_Upload(file) for file in form.getlist('files') + form.getlist('file')
+             if isinstance(file, UploadFile) and file.filename]
+    if not files:
+        return JSONResponse({'success': False, 'error': 'No files uploaded'})
+
+    try:
+        top_k = flask_app.get_top_k(request_values(request, form))
+        result = await run_inference(flask_app.process_batch, flask_app.iter_uploaded_images(files), top_k)
+    except (ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+        flask_app.REQUESTS.inc(endpoint='predict_batch', outcome='error')
+        return JSONResponse({'success': False, 'error': str(e)})
+    flask_app.REQUESTS.inc(endpoint='predict_batch', outcome='success')
+    return JSONResponse(result)
+
+
+app = Starlette(
+    routes=[
+        Route('/predict', predict, methods=['POST']),
+        Route('/predict_batch', predict_batch, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app.app)),
+    ],
+    on_startup=[flask_app.init_worker],
+)
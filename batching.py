@@ -0,0 +1,146 @@
+"""Dynamic micro-batching for CNN inference.
+
+Concurrent requests each submit a single preprocessed image; a background worker
+thread coalesces them into one batch (up to ``max_batch_size`` images, waiting at
+most ``max_wait_ms`` after the first one arrives), runs one forward pass and hands
+each caller its own row of probabilities.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+def _bucket(value):
+    """Round a positive count up to the next power of two for histogram bucketing."""
+    bucket = 1
+    while bucket < value:
+        bucket *= 2
+    return bucket
+
+
+class MicroBatcher:
+    """Coalesce single-image predictions from many threads into batched forward passes."""
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0):
+        """
+        Args:
+            predict_fn: Callable taking a float32 (N, H, W, C) batch and returning (N, classes) probabilities
+            max_batch_size: Largest batch handed to ``predict_fn``
+            max_wait_ms: How long to wait for more requests after the first one arrives
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+        self._requests = 0
+        self._batches = 0
+        self._batched_requests = 0
+        self._max_queue_depth = 0
+        self._batch_size_histogram = {}
+        self._queue_depth_histogram = {}
+
+    def start(self):
+        """Start the worker thread (idempotent)."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the worker thread after it drains the requests already queued."""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def submit(self, image_array):
+        """Queue one preprocessed (H, W, C) image and return a Future for its probabilities."""
+        if not self._running:
+            self.start()
+        future = Future()
+        self._queue.put((image_array, future))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._requests += 1
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def predict(self, image_array, timeout=None):
+        """Blocking helper: submit one image and wait for its probabilities."""
+        return self.submit(image_array).result(timeout)
+
+    def stats(self):
+        """Return queue depth and batch-size histograms for tuning."""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'requests': self._requests,
+                'batches': self._batches,
+                'mean_batch_size': self._batched_requests / self._batches if self._batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_size_histogram.items())),
+                'queue_depth_histogram': dict(sorted(self._queue_depth_histogram.items())),
+            }
+
+    def _collect(self, first):
+        """Gather up to ``max_batch_size`` items, waiting at most ``max_wait`` after ``first``."""
+        items = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop sentinel: put it back so the run loop exits after this batch
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            depth = self._queue.qsize() + 1
+            items = self._collect(first)
+            # Skip callers that gave up (cancelled) before their batch was formed
+            items = [(array, future) for array, future in items if future.set_running_or_notify_cancel()]
+            if not items:
+                continue
+
+            with self._lock:
+                size = len(items)
+                self._batches += 1
+                self._batched_requests += size
+                self._batch_size_histogram[size] = self._batch_size_histogram.get(size, 0) + 1
+                depth_bucket = _bucket(depth)
+                self._queue_depth_histogram[depth_bucket] = self._queue_depth_histogram.get(depth_bucket, 0) + 1
+
+            try:
+                batch = np.stack([array for array, _ in items]).astype('float32', copy=False)
+                probabilities = np.asarray(self.predict_fn(batch))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for row, (_, future) in enumerate(items):
+                future.set_result(probabilities[row])
@@ -0,0 +1,65 @@
+"""Benchmark Keras Model.predict against the compiled InferenceEngine.
+
+Runs both paths on random 32x32x3 batches and reports per-call latency
+(mean / p50 / p99) and throughput for each batch size.
+
+Usage:
+    python benchmarks/bench_inference.py [--model traffic-sign.h5] [--batch-sizes 1,8,32] [--iterations 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+
+import config  # noqa: E402
+import inference  # noqa: E402
+
+
+def time_calls(fn, batch, iterations, warmup=10):
+    """Return per-call latencies in milliseconds after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        fn(batch)
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn(batch)
+        latencies[i] = (time.perf_counter() - started) * 1000
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare Model.predict with the compiled inference engine')
+    parser.add_argument('--model', default=config.MODEL_PATH)
+    parser.add_argument('--batch-sizes', default='1,8,32')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    keras_model = inference.load_keras_model(args.model)
+    engine = inference.InferenceEngine(keras_model, config.INFERENCE_BUCKETS)
+    engine.warm_up()
+
+    paths = {
+        'keras predict()': lambda batch: keras_model.predict(batch, verbose=0),
+        'compiled engine': engine.predict,
+    }
+
+    rng = np.random.default_rng(0)
+    print(f"{'path':<18}{'batch':>6}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'img/s':>10}")
+    for batch_size in [int(size) for size in args.batch_sizes.split(',')]:
+        batch = rng.random((batch_size,) + inference.INPUT_SHAPE, dtype=np.float32)
+        for name, fn in paths.items():
+            latencies = time_calls(fn, batch, args.iterations)
+            print(f"{name:<18}{batch_size:>6}{latencies.mean():>10.3f}{np.percentile(latencies, 50):>10.3f}"
+                  f"{np.percentile(latencies, 99):>10.3f}{batch_size * 1000 / latencies.mean():>10.0f}")
+
+        # Both paths must agree before their timings mean anything
+        np.testing.assert_allclose(engine.predict(batch), keras_model.predict(batch, verbose=0), atol=1e-5)
+
+
+if __name__ == '__main__':
+    main()
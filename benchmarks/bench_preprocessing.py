@@ -0,0 +1,93 @@
+"""Benchmark the old per-request preprocessing against the preprocessing module.
+
+Decodes the same encoded images through both paths and reports time per image
+(mean / p50 / p99) and the peak NumPy/Python allocation per image (tracemalloc;
+PIL's own decode buffers are not traced, so the draft-mode saving shows up in time).
+Without --images a large synthetic JPEG and PNG are generated so the effect of
+JPEG draft decoding on camera-sized photos is visible.
+
+Usage:
+    python benchmarks/bench_preprocessing.py [--images tests/] [--iterations 50] [--size 3000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import preprocessing  # noqa: E402
+
+
+def legacy_preprocess(image_file):
+    """The preprocessing /predict used before the preprocessing module."""
+    image = Image.open(image_file).convert("RGB")
+    image_resized = image.resize((32, 32))
+    image_array = np.array(image_resized).astype('float32') / 255.0
+    return np.expand_dims(image_array, axis=0)
+
+
+def module_preprocess(image_file):
+    return preprocessing.load_image(image_file)[np.newaxis]
+
+
+def synthetic_images(size):
+    """Encode a noisy gradient as JPEG and PNG at ``size`` x ``size`` pixels."""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, size, dtype=np.float32)
+    pixels = np.stack([np.add.outer(gradient, gradient) / 2] * 3, axis=-1)
+    pixels = np.clip(pixels + rng.normal(0, 8, pixels.shape), 0, 255).astype(np.uint8)
+    images = {}
+    for image_format in ('JPEG', 'PNG'):
+        buffer = BytesIO()
+        Image.fromarray(pixels).save(buffer, format=image_format)
+        images[f"synthetic {size}px .{image_format.lower()}"] = buffer.getvalue()
+    return images
+
+
+def measure(fn, data, iterations):
+    """Return (latencies in ms, peak traced bytes) for ``iterations`` calls on encoded bytes."""
+    fn(BytesIO(data))
+    tracemalloc.start()
+    fn(BytesIO(data))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn(BytesIO(data))
+        latencies[i] = (time.perf_counter() - started) * 1000
+    return latencies, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare legacy preprocessing with the preprocessing module')
+    parser.add_argument('--images', default=None, help='Folder of images (default: synthetic large images)')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--size', type=int, default=3000, help='Side of the synthetic images in pixels')
+    args = parser.parse_args()
+
+    if args.images:
+        images = {}
+        for path in preprocessing.find_images(args.images):
+            with open(path, 'rb') as f:
+                images[os.path.basename(path)] = f.read()
+    else:
+        images = synthetic_images(args.size)
+
+    paths = {'legacy': legacy_preprocess, 'preprocessing': module_preprocess}
+    print(f"{'image':<36}{'path':<15}{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'peak KiB':>10}")
+    for name, data in images.items():
+        for path_name, fn in paths.items():
+            latencies, peak = measure(fn, data, args.iterations)
+            print(f"{name[:35]:<36}{path_name:<15}{latencies.mean():>9.3f}{np.percentile(latencies, 50):>9.3f}"
+                  f"{np.percentile(latencies, 99):>9.3f}{peak / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""Reproducible, offline latency benchmark of the /predict serving path.
+
+Starts --workers server processes, each running the Flask app on its own port
+(werkzeug, threaded) with ``gemini_client.model_factory`` replaced by a seeded stub
+whose latency and failure rate are configurable, so no network or API key is
+needed. A closed-loop client then sweeps --concurrency levels, spreading requests
+round-robin over the workers and over a fixed image mix: the tests/ images plus
+synthetic JPEG and PNG images of --synthetic-sizes. Per level it reports throughput,
+p50/p95/p99 latency, errors and the RSS (current and peak) of every worker.
+
+Results are written as JSON, tagged with the git commit, so runs can be compared
+across commits:
+
+    python benchmarks/bench_serving.py --output before.json
+    git checkout my-branch
+    python benchmarks/bench_serving.py --output after.json --compare before.json
+
+Requests send no_cache=1 by default so every request exercises the full path, and
+ESCALATION_ENABLED=false (--always-escalate) forces the Gemini calls on every one.
+
+Usage:
+    python benchmarks/bench_serving.py [--workers 1] [--concurrency 1,4,16] [--requests 200]
+                                       [--gemini-latency-ms 400] [--gemini-jitter-ms 100]
+                                       [--gemini-failure-rate 0.05] [--output results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCHMARK_DIR, '..')
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import preprocessing  # noqa: E402
+from load_test import multipart_body, post  # noqa: E402
+
+TEST_IMAGE_DIR = os.path.join(REPO_DIR, 'tests')
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stand-in for ``genai.GenerativeModel`` with seeded latency and failures.
+
+    Prediction prompts (the ones asking for SIGN_TYPE) get a sign name drawn from
+    ``sign_names``; every other prompt gets a fixed analysis text. Streaming calls
+    spread the latency over a few chunks.
+    """
+
+    latency = 0.4
+    jitter = 0.1
+    failure_rate = 0.0
+    sign_names = ('Stop',)
+    _random = random.Random(0)
+    _lock = threading.Lock()
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    @classmethod
+    def configure(cls, latency, jitter, failure_rate, sign_names, seed):
+        cls.latency = latency
+        cls.jitter = jitter
+        cls.failure_rate = failure_rate
+        cls.sign_names = tuple(sign_names) or cls.sign_names
+        cls._random = random.Random(seed)
+
+    def _draw(self):
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            return delay, self._random.random() < self.failure_rate, self._random.choice(self.sign_names)
+
+    def _text(self, contents, sign_name):
+        prompt = contents[0] if isinstance(contents, (list, tuple)) else contents
+        if isinstance(prompt, str) and 'SIGN_TYPE:' in prompt:
+            return (f"SIGN_TYPE: {sign_name}\nCONFIDENCE: High\n"
+                    f"EXPLANATION: Stub response from {self.model_name}.")
+        return ("**Sign Meaning:** Stub analysis.\n**Driver Action:** None, this is a benchmark.\n"
+                "**Common Locations:** Nowhere.\n**Importance:** Low.")
+
+    def generate_content(self, contents, stream=False):
+        delay, fail, sign_name = self._draw()
+        if stream:
+            return self._stream(contents, delay, fail, sign_name)
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"Stub failure from {self.model_name}")
+        return _StubResponse(self._text(contents, sign_name))
+
+    def _stream(self, contents, delay, fail, sign_name):
+        lines = self._text(contents, sign_name).splitlines(keepends=True)
+        for index, line in enumerate(lines):
+            time.sleep(delay / len(lines))
+            if fail and index == len(lines) // 2:
+                raise RuntimeError(f"Stub failure from {self.model_name}")
+            yield _StubResponse(line)
+
+
+def serve(port, settings, ready, seed):
+    """Worker process: import the app with the stubbed Gemini client and serve it on ``port``."""
+    os.environ.update(settings)
+    from werkzeug.serving import make_server
+
+    import app as app_module
+    import gemini_client
+
+    StubModel.configure(float(settings['BENCH_GEMINI_LATENCY']), float(settings['BENCH_GEMINI_JITTER']),
+                        float(settings['BENCH_GEMINI_FAILURE_RATE']), app_module.sign_labels.names, seed)
+    gemini_client.model_factory = StubModel
+    app_module.init_worker()
+    server = make_server('127.0.0.1', port, app_module.app, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def synthetic_image(size, image_format, seed):
+    """Encode a deterministic size x size image: a red disc on a noisy gradient."""
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0, 255, size, dtype=np.float32)
+    pixels = np.stack([np.add.outer(ramp, ramp) / 2, np.tile(ramp, (size, 1)), np.tile(ramp[:, None], (1, size))], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape)
+    y, x = np.ogrid[:size, :size]
+    disc = (x - size / 2) ** 2 + (y - size / 2) ** 2 < (size / 3) ** 2
+    pixels[disc] = (200, 30, 30)
+    buffer = BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+
+def image_mix(sizes, seed):
+    """Return [(filename, bytes)]: the tests/ images plus a JPEG and a PNG per synthetic size."""
+    images = []
+    for path in preprocessing.find_images(TEST_IMAGE_DIR):
+        with open(path, 'rb') as f:
+            images.append((os.path.basename(path), f.read()))
+    for size in sizes:
+        images.append((f'synthetic-{size}.jpg', synthetic_image(size, 'JPEG', seed + size)))
+        images.append((f'synthetic-{size}.png', synthetic_image(size, 'PNG', seed + size)))
+    return images
+
+
+def worker_memory(pid):
+    """Return (current, peak) RSS in MiB of a process, from /proc (None where unavailable)."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def run_level(urls, bodies, concurrency, total, timeout):
+    """Closed loop at one concurrency; requests rotate over the workers and, per worker, over the images."""
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    counter = [0]
+
+    def client():
+        while True:
+            with lock:
+                index = counter[0]
+                if index >= total:
+                    return
+                counter[0] += 1
+            body, content_type = bodies[(index // len(urls)) % len(bodies)]
+            latency, ok, error = post(urls[index % len(urls)], body, content_type, timeout)
+            with lock:
+                latencies.append(latency)
+                if not ok:
+                    errors[error] = errors.get(error, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), errors, time.perf_counter() - started
+
+
+def summarize(latencies, errors, elapsed):
+    ms = latencies * 1000
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_ms': {
+            'mean': round(float(ms.mean()), 2),
+            'p50': round(float(np.percentile(ms, 50)), 2),
+            'p95': round(float(np.percentile(ms, 95)), 2),
+            'p99': round(float(np.percentile(ms, 99)), 2),
+            'max': round(float(ms.max()), 2),
+        },
+        'errors': sum(errors.values()),
+        'error_messages': dict(sorted(errors.items(), key=lambda item: -item[1])[:5]),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def print_comparison(current, baseline_path):
+    """Print throughput and latency changes against a previous results file, per concurrency level."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {level['concurrency']: level for level in baseline['levels']}
+    print(f"\nvs. {baseline_path} (commit {str(baseline.get('commit'))[:12]})")
+    print(f"{'concurrency':>11}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for level in current['levels']:
+        old = previous.get(level['concurrency'])
+        if old is None:
+            continue
+
+        def change(new_value, old_value):
+            return f"{(new_value - old_value) / old_value * 100:+.1f}%" if old_value else 'n/a'
+
+        print(f"{level['concurrency']:>11}{change(level['throughput_rps'], old['throughput_rps']):>10}"
+              + ''.join(f"{change(level['latency_ms'][key], old['latency_ms'][key]):>10}"
+                        for key in ('p50', 'p95', 'p99')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline /predict latency benchmark with a stubbed Gemini client')
+    parser.add_argument('--workers', type=int, default=1, help='Server processes')
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated client concurrency levels')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per concurrency level')
+    parser.add_argument('--synthetic-sizes', default='64,640,2000', help='Side lengths of the synthetic images')
+    parser.add_argument('--gemini-latency-ms', type=float, default=400)
+    parser.add_argument('--gemini-jitter-ms', type=float, default=100, help='Standard deviation of the stub latency')
+    parser.add_argument('--gemini-failure-rate', type=float, default=0.05)
+    parser.add_argument('--always-escalate', action='store_true', help='Call Gemini on every request')
+    parser.add_argument('--cache', action='store_true', help='Leave the result cache on (no_cache=1 otherwise)')
+    parser.add_argument('--engine', default=None, help='INFERENCE_ENGINE for the workers')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', default=None, help='Results file (default benchmarks/results/serving-<commit>.json)')
+    parser.add_argument('--compare', default=None, help='Previous results file to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-serving-')
+    settings = {
+        'EAGER_LOAD_MODEL': 'true',
+        'LOG_LEVEL': 'WARNING',
+        'LOG_FILE': os.path.join(workdir, 'app.log'),
+        'DESCRIPTION_STORE_PATH': os.path.join(workdir, 'class_descriptions.json'),
+        'DESCRIPTION_REFRESH_INTERVAL': '0',
+        'RESULT_CACHE_DB': '',
+        'BENCH_GEMINI_LATENCY': str(args.gemini_latency_ms / 1000),
+        'BENCH_GEMINI_JITTER': str(args.gemini_jitter_ms / 1000),
+        'BENCH_GEMINI_FAILURE_RATE': str(args.gemini_failure_rate),
+    }
+    if args.always_escalate:
+        settings['ESCALATION_ENABLED'] = 'false'
+    if args.engine:
+        settings['INFERENCE_ENGINE'] = args.engine
+
+    sizes = [int(size) for size in args.synthetic_sizes.split(',') if size.strip()]
+    images = image_mix(sizes, args.seed)
+    fields = {} if args.cache else {'no_cache': '1'}
+    bodies = [multipart_body(data, name, fields) for name, data in images]
+
+    # spawn: every worker imports TensorFlow and the app from scratch, as a server process would.
+    # The settings go into the inherited environment too, so they are in place even for modules
+    # a child imports while unpickling serve() (this file's own imports), before serve() runs.
+    os.environ.update(settings)
+    context = multiprocessing.get_context('spawn')
+    workers = []
+    for index in range(args.workers):
+        port = free_port()
+        ready = context.Event()
+        process = context.Process(target=serve, args=(port, settings, ready, args.seed + index), daemon=True)
+        process.start()
+        workers.append((process, port, ready))
+
+    try:
+        for process, port, ready in workers:
+            while not ready.wait(timeout=1):
+                if not process.is_alive():
+                    print(f"Worker on port {port} exited during startup (code {process.exitcode})")
+                    return 1
+        urls = [f'http://127.0.0.1:{port}/predict' for _, port, _ in workers]
+
+        # Warm-up: every image once on every worker, untimed
+        run_level(urls, bodies, 1, len(urls) * len(bodies), args.timeout)
+
+        results = {
+            'benchmark': 'serving',
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+            'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            'images': [{'name': name, 'bytes': len(data)} for name, data in images],
+            'levels': [],
+        }
+        print(f"{args.workers} worker(s), {len(images)} images, {args.requests} requests per level, "
+              f"Gemini stub {args.gemini_latency_ms:.0f}±{args.gemini_jitter_ms:.0f} ms, "
+              f"{args.gemini_failure_rate:.0%} failures")
+        print(f"{'concurrency':>11}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+              f"{'errors':>8}  RSS MiB per worker (peak)")
+        for concurrency in [int(level) for level in args.concurrency.split(',') if level.strip()]:
+            latencies, errors, elapsed = run_level(urls, bodies, concurrency, args.requests, args.timeout)
+            level = {'concurrency': concurrency, **summarize(latencies, errors, elapsed)}
+            level['workers'] = [dict(zip(('rss_mib', 'peak_rss_mib'), worker_memory(process.pid)))
+                                for process, _, _ in workers]
+            results['levels'].append(level)
+            latency = level['latency_ms']
+            memory = ', '.join(f"{worker['rss_mib']} ({worker['peak_rss_mib']})" for worker in level['workers'])
+            print(f"{concurrency:>11}{level['throughput_rps']:>8.1f}{latency['p50']:>10.1f}{latency['p95']:>10.1f}"
+                  f"{latency['p99']:>10.1f}{latency['max']:>10.1f}{level['errors']:>8}  {memory}")
+    finally:
+        for process, _, _ in workers:
+            process.terminate()
+            process.join(timeout=5)
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results', f"serving-{(results['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
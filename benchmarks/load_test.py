@@ -0,0 +1,116 @@
+"""Closed-loop load test for /predict against one or more running servers.
+
+Each of --concurrency client threads posts an image, waits for the answer and
+immediately posts the next, until --requests requests have completed. For every
+target URL it reports throughput, latency percentiles and errors, so the sync
+(gunicorn) and async (uvicorn asgi_app) serving modes can be compared side by side:
+
+    gunicorn -c gunicorn.conf.py app:app --bind 127.0.0.1:5000 --workers 2 &
+    uvicorn asgi_app:app --port 5001 --workers 2 &
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --url http://127.0.0.1:5001
+
+The client needs only numpy and the standard library, so it runs from any machine.
+
+Usage:
+    python benchmarks/load_test.py --url URL [--url URL ...] [--image tests/...jpg]
+                                   [--concurrency 16] [--requests 200] [--field no_cache=1]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'speed-limit-sign-30-km-h.jpg')
+
+
+def multipart_body(image, filename, fields):
+    """Encode the image bytes (as 'file') and extra form fields as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+                 f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode())
+    parts.append(image + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def post(url, body, content_type, timeout):
+    """POST one request; return (latency seconds, ok, error message)."""
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.loads(response.read())
+        ok = bool(result.get('success'))
+        return time.perf_counter() - started, ok, None if ok else str(result.get('error'))[:80]
+    except Exception as e:
+        return time.perf_counter() - started, False, str(e)[:80]
+
+
+def run_load(url, body, content_type, concurrency, total, timeout):
+    """Run the closed loop against one URL and return per-request latencies and errors."""
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    remaining = [total]
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            latency, ok, error = post(url, body, content_type, timeout)
+            with lock:
+                latencies.append(latency)
+                if not ok:
+                    errors[error] = errors.get(error, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Closed-loop /predict load test')
+    parser.add_argument('--url', action='append', required=True, help='Server base URL (repeat to compare)')
+    parser.add_argument('--path', default='/predict')
+    parser.add_argument('--image', default=DEFAULT_IMAGE)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--field', action='append', default=[], help='Extra form field, e.g. no_cache=1')
+    args = parser.parse_args()
+
+    fields = dict(field.split('=', 1) for field in args.field)
+    with open(args.image, 'rb') as f:
+        body, content_type = multipart_body(f.read(), os.path.basename(args.image), fields)
+    print(f"{args.requests} requests, {args.concurrency} concurrent, image {os.path.basename(args.image)}, fields {fields}")
+    print(f"{'target':<32}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for url in args.url:
+        latencies, errors, elapsed = run_load(url.rstrip('/') + args.path, body, content_type,
+                                              args.concurrency, args.requests, args.timeout)
+        ms = latencies * 1000
+        print(f"{url[:31]:<32}{len(latencies) / elapsed:>8.1f}{np.percentile(ms, 50):>10.1f}"
+              f"{np.percentile(ms, 95):>10.1f}{np.percentile(ms, 99):>10.1f}{ms.max():>10.1f}"
+              f"{sum(errors.values()):>8}")
+        for error, count in sorted(errors.items(), key=lambda item: -item[1])[:3]:
+            print(f"    {count} x {error}")
+
+
+if __name__ == '__main__':
+    main()
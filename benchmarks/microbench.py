@@ -0,0 +1,305 @@
+"""Microbenchmarks of the per-request hot path, with a stored baseline.
+
+Times the pieces inside ``process_image`` in isolation, pytest-benchmark style:
+each case is calibrated so one round lasts at least --min-round-ms, then run for
+at least --min-time seconds, and reported as min / median / mean / stddev per call.
+
+Groups:
+    decode      full vs. draft decoding of the tests/ images and a large synthetic JPEG
+    resize      PIL resize to 32x32, and resize + copy into a batch row (write_row)
+    normalize   in-place scaling of 1 / 32 / 128 image batches
+    inference   Keras model.predict vs. a direct model() call vs. the configured engine,
+                at --batch-sizes (skipped without TensorFlow or the model file)
+    postprocess argmax, inference.top_k, label lookup and SignMatcher (cold and cached)
+    gemini      parse_gemini_prediction and compare_predictions (skipped if app.py
+                cannot be imported)
+
+Results go to --output as JSON; --compare flags every case whose median got more
+than --threshold slower than in a previous results file and exits with status 1,
+so it can gate a change. Baselines are only comparable on the same machine:
+
+    python benchmarks/microbench.py --output benchmarks/results/microbench-baseline.json
+    python benchmarks/microbench.py --compare benchmarks/results/microbench-baseline.json
+
+benchmarks/microbench-baseline.json is a committed reference run (without the
+inference group, as the model file is not in the repository).
+
+Usage:
+    python benchmarks/microbench.py [--group decode,normalize] [-k name-substring]
+                                    [--batch-sizes 1,8,32,128] [--min-time 0.5]
+                                    [--output results.json] [--compare baseline.json] [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCHMARK_DIR, '..')
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import config  # noqa: E402
+import inference  # noqa: E402
+import labels  # noqa: E402
+import preprocessing  # noqa: E402
+from bench_serving import synthetic_image  # noqa: E402
+from sign_matcher import SignMatcher  # noqa: E402
+
+GROUPS = ('decode', 'resize', 'normalize', 'inference', 'postprocess', 'gemini')
+NUM_CLASSES = 43
+
+GEMINI_RESPONSE = """SIGN_TYPE: Speed limit (30km/h)
+CONFIDENCE: High
+EXPLANATION: A circular sign with a red border and the number 30 in the centre.
+It limits the speed to 30 km/h."""
+
+
+class Skip(Exception):
+    """A group's dependencies are missing."""
+
+
+class Case:
+    """One benchmark: ``fn()`` is timed; with ``setup``, ``fn(*setup())`` is timed once per round."""
+
+    def __init__(self, group, name, fn, setup=None):
+        self.group = group
+        self.name = f'{group}/{name}'
+        self.fn = fn
+        self.setup = setup
+
+
+def measure(case, min_time, min_round, max_rounds, min_rounds=5):
+    """Return per-call timings in seconds: one entry per round, each the mean of ``loops`` calls."""
+    fn = case.fn
+    if case.setup is not None:
+        # Pedantic mode: fresh arguments every round (e.g. arrays the call mutates), one call per round
+        fn(*case.setup())
+        timings = []
+        deadline = time.perf_counter() + min_time
+        while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() < deadline):
+            args = case.setup()
+            started = time.perf_counter()
+            fn(*args)
+            timings.append(time.perf_counter() - started)
+        return np.array(timings), 1
+
+    fn()  # warm-up
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round or loops >= 1 << 20:
+            break
+        loops *= 2
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - started) / loops)
+    return np.array(timings), loops
+
+
+def benchmark_images():
+    """Return [(name, bytes)]: the tests/ images and a 2000px synthetic JPEG."""
+    images = []
+    for path in preprocessing.find_images(os.path.join(REPO_DIR, 'tests')):
+        with open(path, 'rb') as f:
+            images.append((os.path.basename(path), f.read()))
+    images.append(('synthetic-2000.jpg', synthetic_image(2000, 'JPEG', 0)))
+    return images
+
+
+def decode_cases(args):
+    for name, data in benchmark_images():
+        yield Case('decode', f'{name}/full', lambda data=data: Image.open(BytesIO(data)).convert('RGB'))
+        yield Case('decode', f'{name}/draft',
+                   lambda data=data: preprocessing.open_image(BytesIO(data), preprocessing.IMAGE_SIZE, True))
+
+
+def resize_cases(args):
+    row = preprocessing.empty_batch(1)[0]
+    for name, data in benchmark_images():
+        image = Image.open(BytesIO(data)).convert('RGB')
+        yield Case('resize', f'{name}/resize', lambda image=image: image.resize(preprocessing.IMAGE_SIZE))
+        yield Case('resize', f'{name}/write_row', lambda image=image: preprocessing.write_row(image, row))
+
+
+def normalize_cases(args):
+    rng = np.random.default_rng(0)
+    for count in (1, 32, 128):
+        pixels = rng.integers(0, 256, (count,) + preprocessing.empty_batch(1).shape[1:]).astype(np.float32)
+        # normalize() scales in place, so every round gets a fresh copy (not timed)
+        yield Case('normalize', f'batch-{count}', preprocessing.normalize, setup=lambda pixels=pixels: (pixels.copy(),))
+
+
+def inference_cases(args):
+    if not os.path.exists(args.model):
+        raise Skip(f"model not found: {args.model}")
+    try:
+        import tensorflow as tf
+    except ImportError:
+        raise Skip('TensorFlow is not installed')
+    model = inference.load_keras_model(args.model)
+    engine = inference.load_engine(args.model, config.INFERENCE_ENGINE, config.INFERENCE_BUCKETS,
+                                   config.INFERENCE_THREADS)
+    rng = np.random.default_rng(0)
+    for size in args.batch_sizes:
+        batch = rng.random((size,) + preprocessing.empty_batch(1).shape[1:], dtype=np.float32)
+        tensor = tf.constant(batch)
+        yield Case('inference', f'batch-{size}/model.predict', lambda batch=batch: model.predict(batch, verbose=0))
+        yield Case('inference', f'batch-{size}/model-call', lambda tensor=tensor: model(tensor, training=False).numpy())
+        yield Case('inference', f'batch-{size}/engine-{config.INFERENCE_ENGINE}',
+                   lambda batch=batch: engine.predict(batch, verbose=0))
+
+
+def postprocess_cases(args):
+    rng = np.random.default_rng(0)
+    sign_labels = labels.load_labels(config.SIGNNAME_CSV)
+    matcher = SignMatcher(sign_labels)
+    for count in (1, 128):
+        probabilities = rng.dirichlet(np.ones(NUM_CLASSES), count).astype(np.float32)
+        yield Case('postprocess', f'batch-{count}/argmax', lambda p=probabilities: np.argmax(p, axis=1))
+        yield Case('postprocess', f'batch-{count}/top_k-3', lambda p=probabilities: inference.top_k(p, 3))
+    class_ids = rng.integers(0, len(sign_labels), 128).tolist()
+    yield Case('postprocess', 'label-name', lambda: sign_labels.name(class_ids[0]))
+    yield Case('postprocess', 'label-name-128', lambda: [sign_labels.name(class_id) for class_id in class_ids])
+    yield Case('postprocess', 'match-exact', lambda: matcher._match('Speed limit (30km/h)'))
+    yield Case('postprocess', 'match-fuzzy', lambda: matcher._match('30 km/h speed limit sign'))
+    yield Case('postprocess', 'match-cached', lambda: matcher.match('30 km/h speed limit sign'))
+
+
+def gemini_cases(args):
+    try:
+        import app
+    except Exception as e:
+        raise Skip(f"cannot import app ({e})")
+    agree = app.parse_gemini_prediction(GEMINI_RESPONSE)
+    disagree = dict(agree, predicted_sign='No entry')
+    yield Case('gemini', 'parse_gemini_prediction', lambda: app.parse_gemini_prediction(GEMINI_RESPONSE))
+    yield Case('gemini', 'compare_predictions/agree',
+               lambda: app.compare_predictions('Speed limit (30km/h)', 0.72, agree))
+    yield Case('gemini', 'compare_predictions/disagree',
+               lambda: app.compare_predictions('Speed limit (30km/h)', 0.72, disagree))
+
+
+CASES = {
+    'decode': decode_cases,
+    'resize': resize_cases,
+    'normalize': normalize_cases,
+    'inference': inference_cases,
+    'postprocess': postprocess_cases,
+    'gemini': gemini_cases,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results, baseline_path, threshold):
+    """Print the median change of every case against a baseline; return the names of regressed cases."""
+    with open(baseline_path) as f:
+        baseline = {case['name']: case for case in json.load(f)['cases']}
+    print(f"\nvs. {baseline_path}, regression threshold +{threshold:.0%} on the median")
+    print(f"{'case':<66}{'old us':>12}{'new us':>12}{'change':>9}")
+    regressed = []
+    for case in results['cases']:
+        old = baseline.get(case['name'])
+        if old is None:
+            continue
+        change = (case['median_us'] - old['median_us']) / old['median_us']
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressed.append(case['name'])
+        print(f"{case['name']:<66}{old['median_us']:>12.2f}{case['median_us']:>12.2f}{change:>+9.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks of preprocessing, inference and post-processing')
+    parser.add_argument('--group', default=','.join(GROUPS), help=f"Comma-separated groups ({', '.join(GROUPS)})")
+    parser.add_argument('-k', dest='keyword', default=None, help='Only cases whose name contains this')
+    parser.add_argument('--model', default=config.MODEL_PATH)
+    parser.add_argument('--batch-sizes', default='1,8,32,128')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Seconds per case')
+    parser.add_argument('--min-round-ms', type=float, default=2.0, help='Calibrate loops per round to at least this')
+    parser.add_argument('--max-rounds', type=int, default=10000)
+    parser.add_argument('--output', default=None, help='Write results as JSON')
+    parser.add_argument('--compare', default=None, help='Baseline results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed median slowdown (0.2 = 20%%)')
+    args = parser.parse_args()
+    args.batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size.strip()]
+
+    groups = [group.strip() for group in args.group.split(',') if group.strip()]
+    unknown = [group for group in groups if group not in CASES]
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(unknown)}")
+
+    results = {
+        'benchmark': 'microbench',
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'numpy': np.__version__, 'cpus': os.cpu_count(), 'engine': config.INFERENCE_ENGINE},
+        'cases': [],
+        'skipped': {},
+    }
+    print(f"{'case':<66}{'min us':>12}{'median us':>12}{'mean us':>12}{'stddev':>10}{'rounds':>8}")
+    for group in groups:
+        try:
+            for case in CASES[group](args):
+                if args.keyword and args.keyword not in case.name:
+                    continue
+                timings, loops = measure(case, args.min_time, args.min_round_ms / 1000, args.max_rounds)
+                us = timings * 1e6
+                row = {
+                    'name': case.name,
+                    'min_us': round(float(us.min()), 3),
+                    'median_us': round(float(np.median(us)), 3),
+                    'mean_us': round(float(us.mean()), 3),
+                    'stddev_us': round(float(us.std()), 3),
+                    'rounds': len(us),
+                    'loops': loops,
+                }
+                results['cases'].append(row)
+                print(f"{case.name:<66}{row['min_us']:>12.2f}{row['median_us']:>12.2f}{row['mean_us']:>12.2f}"
+                      f"{row['stddev_us']:>10.2f}{row['rounds']:>8}")
+        except Skip as e:
+            results['skipped'][group] = str(e)
+            print(f"{group + '/*':<66}skipped: {e}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressed = regressions(results, args.compare, args.threshold)
+        if regressed:
+            print(f"{len(regressed)} regression(s)")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
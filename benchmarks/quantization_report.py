@@ -0,0 +1,85 @@
+"""Compare the float32 model with its int8-quantized export on real sign images.
+
+Runs every engine on the same images (one image per call, as /predict does) and
+reports, against the first engine as the reference: top-1 agreement, max and mean
+absolute probability delta, per-image latency (mean / p50 / p99), artifact size
+and the resident memory added by loading the engine.
+
+Usage:
+    python benchmarks/quantization_report.py [--images tests/] [--engines tflite,tflite_int8] [--iterations 20]
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+
+import config  # noqa: E402
+import inference  # noqa: E402
+import preprocessing  # noqa: E402
+
+
+def rss_mib():
+    """Current resident set size in MiB (falls back to peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_engine(engine, images, iterations):
+    """Return (probabilities, per-image latencies in ms) running one image per call."""
+    engine.predict(images[:1])
+    probabilities = np.stack([engine.predict(image[np.newaxis])[0] for image in images])
+    latencies = []
+    for _ in range(iterations):
+        for image in images:
+            started = time.perf_counter()
+            engine.predict(image[np.newaxis])
+            latencies.append((time.perf_counter() - started) * 1000)
+    return probabilities, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Accuracy/latency/memory report for float32 vs int8 models')
+    parser.add_argument('--model', default=config.MODEL_PATH)
+    parser.add_argument('--images', default=os.path.join(config.BASE_DIR, 'tests'), help='Folder of sign images')
+    parser.add_argument('--engines', default='tflite,tflite_int8', help='Engines to compare; the first is the reference')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed passes over the images')
+    args = parser.parse_args()
+
+    paths = preprocessing.find_images(args.images)
+    if not paths:
+        print(f"No images found in {args.images}")
+        return 1
+    images, _, _ = preprocessing.load_batch(paths)
+    print(f"{len(images)} images from {args.images}\n")
+
+    reference = None
+    print(f"{'engine':<13}{'size KiB':>10}{'load MiB':>10}{'top-1':>9}{'max Δp':>10}{'mean Δp':>10}"
+          f"{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for engine_name in args.engines.split(','):
+        path = inference.artifact_path(args.model, engine_name)
+        rss_before = rss_mib()
+        engine = inference.load_engine(args.model, engine_name, config.INFERENCE_BUCKETS, config.INFERENCE_THREADS)
+        probabilities, latencies = run_engine(engine, images, args.iterations)
+        load_mib = rss_mib() - rss_before
+
+        if reference is None:
+            reference = probabilities
+        delta = np.abs(probabilities - reference)
+        agreement = np.mean(np.argmax(probabilities, axis=1) == np.argmax(reference, axis=1))
+        print(f"{engine_name:<13}{os.path.getsize(path) / 1024:>10.1f}{load_mib:>10.1f}{agreement:>9.1%}"
+              f"{delta.max():>10.4f}{delta.mean():>10.5f}{latencies.mean():>9.3f}"
+              f"{np.percentile(latencies, 50):>9.3f}{np.percentile(latencies, 99):>9.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
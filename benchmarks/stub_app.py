@@ -0,0 +1,60 @@
+"""The real Flask and ASGI apps with bench_serving's Gemini stub, for load-testing real servers.
+
+Importing this module replaces ``gemini_client.model_factory`` with
+``bench_serving.StubModel`` (no network or API key needed) and, with
+BENCH_STAND_IN_MODEL=true, installs a small NumPy engine with the model's input
+and output shapes, so servers run without traffic-sign.h5. Everything else is the
+unmodified serving code:
+
+    BENCH_STAND_IN_MODEL=true ESCALATION_ENABLED=false \
+        gunicorn -c gunicorn.conf.py benchmarks.stub_app:app --bind 127.0.0.1:5000 --workers 2
+    BENCH_STAND_IN_MODEL=true ESCALATION_ENABLED=false \
+        uvicorn benchmarks.stub_app:asgi --port 5001 --workers 2
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --url http://127.0.0.1:5001
+
+Settings (environment):
+    BENCH_GEMINI_LATENCY       Seconds per stub call (default 0.4)
+    BENCH_GEMINI_JITTER        Standard deviation of the latency (default 0.1)
+    BENCH_GEMINI_FAILURE_RATE  Fraction of failed calls (default 0)
+    BENCH_STAND_IN_MODEL       Use the NumPy stand-in instead of MODEL_PATH (default false)
+"""
+import os
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..'))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import numpy as np  # noqa: E402
+
+import app as app_module  # noqa: E402
+import asgi_app  # noqa: E402
+import gemini_client  # noqa: E402
+import inference  # noqa: E402
+from bench_serving import StubModel  # noqa: E402
+
+
+class StandInEngine:
+    """Fixed random linear classifier over the 32x32x3 input: the model's shapes at negligible cost."""
+
+    def __init__(self, classes, seed=0):
+        weights_shape = (int(np.prod(inference.INPUT_SHAPE)), classes)
+        self.weights = np.random.default_rng(seed).standard_normal(weights_shape).astype('float32') * 0.01
+
+    def predict(self, batch, verbose=0):
+        logits = batch.reshape(len(batch), -1) @ self.weights
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+StubModel.configure(float(os.environ.get('BENCH_GEMINI_LATENCY', 0.4)),
+                    float(os.environ.get('BENCH_GEMINI_JITTER', 0.1)),
+                    float(os.environ.get('BENCH_GEMINI_FAILURE_RATE', 0)),
+                    app_module.sign_labels.names, seed=os.getpid())
+gemini_client.model_factory = StubModel
+if os.environ.get('BENCH_STAND_IN_MODEL', '').lower() in ('1', 'true', 'yes', 'on'):
+    app_module.model = StandInEngine(len(app_module.sign_labels))
+
+app = app_module.app
+asgi = asgi_app.app
@@ -1,6 +1,11 @@
 """
 Configuration file for Traffic Sign Classifier
 Supports environment variables for flexible deployment
+
+Every setting is read from the environment once, at import. Values that do not
+parse or are out of range fall back to their default and are recorded;
+``validate()`` (called by app.py at startup) raises ``ConfigError`` listing all of
+them, so a bad deployment fails fast instead of serving with surprising settings.
 """
 import os
 from pathlib import Path
@@ -8,31 +13,205 @@ from pathlib import Path
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent
 
+_errors = []
+
+
+class ConfigError(ValueError):
+    """One or more settings from the environment are invalid."""
+
+
+def _check(name, value, minimum=None, maximum=None, choices=None):
+    if minimum is not None and value < minimum:
+        _errors.append(f"{name}={value!r} is below the minimum {minimum}")
+        return False
+    if maximum is not None and value > maximum:
+        _errors.append(f"{name}={value!r} is above the maximum {maximum}")
+        return False
+    if choices is not None and value not in choices:
+        _errors.append(f"{name}={value!r} is not one of {', '.join(map(str, choices))}")
+        return False
+    return True
+
+
+def _str(name, default, choices=None, normalize=None):
+    value = os.getenv(name, default)
+    value = normalize(value) if normalize else value
+    return value if _check(name, value, choices=choices) else default
+
+
+def _bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    if value.strip().lower() in ('true', '1', 'yes', 'on'):
+        return True
+    if value.strip().lower() in ('false', '0', 'no', 'off', ''):
+        return False
+    _errors.append(f"{name}={value!r} is not a boolean (true/false)")
+    return default
+
+
+def _number(kind, name, default, minimum=None, maximum=None):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        parsed = kind(value)
+    except ValueError:
+        _errors.append(f"{name}={value!r} is not {'an integer' if kind is int else 'a number'}")
+        return default
+    return parsed if _check(name, parsed, minimum, maximum) else default
+
+
+def _int(name, default, minimum=None, maximum=None):
+    return _number(int, name, default, minimum, maximum)
+
+
+def _float(name, default, minimum=None, maximum=None):
+    return _number(float, name, default, minimum, maximum)
+
+
+def _list(name, default):
+    """Comma-separated strings, e.g. 'a, b' -> ['a', 'b']."""
+    return [item.strip() for item in os.getenv(name, default).split(',') if item.strip()]
+
+
+def _int_list(name, default, minimum=None):
+    """Comma-separated integers, e.g. '1,8,32' -> [1, 8, 32]."""
+    try:
+        values = [int(item) for item in _list(name, default)]
+    except ValueError:
+        _errors.append(f"{name}={os.getenv(name)!r} is not a comma-separated list of integers")
+        return [int(item) for item in default.split(',')]
+    if not all(_check(name, value, minimum) for value in values):
+        return [int(item) for item in default.split(',')]
+    return values
+
+
 # Flask Configuration
-DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
-PORT = int(os.getenv('PORT', 5000))
-HOST = os.getenv('HOST', '0.0.0.0')
+DEBUG = _bool('FLASK_DEBUG', False)
+PORT = _int('PORT', 5000, minimum=1, maximum=65535)
+HOST = _str('HOST', '0.0.0.0')
 
 # Model Configuration
-MODEL_PATH = os.getenv('MODEL_PATH', str(BASE_DIR / 'traffic-sign.h5'))
-SIGNNAME_CSV = os.getenv('SIGNNAME_CSV', str(BASE_DIR / 'signname.csv'))
+MODEL_PATH = _str('MODEL_PATH', str(BASE_DIR / 'traffic-sign.h5'))
+SIGNNAME_CSV = _str('SIGNNAME_CSV', str(BASE_DIR / 'signname.csv'))
 
 # Upload Configuration
-UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', str(BASE_DIR / 'static' / 'uploads'))
-MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
+UPLOAD_FOLDER = _str('UPLOAD_FOLDER', str(BASE_DIR / 'static' / 'uploads'))
+MAX_CONTENT_LENGTH = _int('MAX_CONTENT_LENGTH', 16 * 1024 * 1024, minimum=1)  # 16MB
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
 # Image Processing
-IMAGE_SIZE = (32, 32)  # Model input size
+JPEG_DRAFT_DECODE = _bool('JPEG_DRAFT_DECODE', True)  # Reduced JPEG decoding for batch paths
+
+# /predict uploads: format checked from magic bytes and size from the header before any decoding
+UPLOAD_MAX_PIXELS = _int('UPLOAD_MAX_PIXELS', 50_000_000, minimum=0)  # Width x height limit; 0 = Pillow's own limit
+UPLOAD_DECODE_SIZE = _int('UPLOAD_DECODE_SIZE', 1024, minimum=0)  # Longest side uploads are decoded at; 0 = full size
+
+# /predict image echo: 'none', 'thumbnail' (small base64 JPEG/WebP), 'url' (stored under UPLOAD_FOLDER) or 'png' (as decoded)
+RESPONSE_IMAGE = _str('RESPONSE_IMAGE', 'none', choices=('none', 'thumbnail', 'url', 'png'),
+                      normalize=str.lower)
+RESPONSE_THUMBNAIL_SIZE = _int('RESPONSE_THUMBNAIL_SIZE', 256, minimum=1)  # Longest side in pixels
+RESPONSE_THUMBNAIL_FORMAT = _str('RESPONSE_THUMBNAIL_FORMAT', 'JPEG', choices=('JPEG', 'WEBP'), normalize=str.upper)
 
 # Logging Configuration
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_LEVEL = _str('LOG_LEVEL', 'INFO', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'), normalize=str.upper)
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-LOG_FILE = os.getenv('LOG_FILE', str(BASE_DIR / 'logs' / 'app.log'))
+LOG_FILE = _str('LOG_FILE', str(BASE_DIR / 'logs' / 'app.log'))
 
 # CORS Configuration (for API access from different domains)
-CORS_ENABLED = os.getenv('CORS_ENABLED', 'False').lower() == 'true'
-CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
+CORS_ENABLED = _bool('CORS_ENABLED', False)
+CORS_ORIGINS = _str('CORS_ORIGINS', '*')
 
 # Model Loading Configuration
-EAGER_LOAD_MODEL = os.getenv('EAGER_LOAD_MODEL', 'False').lower() == 'true'
+EAGER_LOAD_MODEL = _bool('EAGER_LOAD_MODEL', False)
+
+# Batch Prediction Configuration
+MAX_BATCH_IMAGES = _int('MAX_BATCH_IMAGES', 256, minimum=1)  # Images per /predict_batch request
+# Zip/tar uploads: checked from the archive's member headers before any member is extracted
+ARCHIVE_MAX_MEMBERS = _int('ARCHIVE_MAX_MEMBERS', 1024, minimum=1)  # Entries per request, across all archives
+ARCHIVE_MAX_MEMBER_BYTES = _int('ARCHIVE_MAX_MEMBER_BYTES', 16 * 1024 * 1024, minimum=1)  # Uncompressed size of one image
+ARCHIVE_MAX_TOTAL_BYTES = _int('ARCHIVE_MAX_TOTAL_BYTES', 256 * 1024 * 1024, minimum=1)  # Uncompressed images per request
+
+# Micro-batching: coalesce concurrent /predict calls into one forward pass.
+# Only useful with a threaded server (e.g. gunicorn --threads 8).
+MICRO_BATCHING = _bool('MICRO_BATCHING', False)
+MICRO_BATCH_MAX_SIZE = _int('MICRO_BATCH_MAX_SIZE', 32, minimum=1)
+MICRO_BATCH_MAX_WAIT_MS = _float('MICRO_BATCH_MAX_WAIT_MS', 5, minimum=0)
+
+# Async (ASGI) serving mode, see asgi_app.py
+ASYNC_INFERENCE_THREADS = _int('ASYNC_INFERENCE_THREADS', 2, minimum=1)  # Bounded pool for decoding and the CNN
+
+# Gemini (Google AI): key and the models tried, in order of preference
+GOOGLE_API_KEY = _str('GOOGLE_API_KEY', '')  # Without it Gemini calls fail and responses fall back to the CNN
+GEMINI_PREDICTION_MODELS = _list('GEMINI_PREDICTION_MODELS', 'gemini-2.5-flash,gemini-2.0-flash,gemini-pro-latest')
+GEMINI_ANALYSIS_MODELS = _list('GEMINI_ANALYSIS_MODELS',
+                               'gemini-2.5-flash,gemini-2.0-flash,gemini-pro-latest,gemini-flash-latest')
+
+# Gemini (Google AI) call execution
+GEMINI_POOL_SIZE = _int('GEMINI_POOL_SIZE', 8, minimum=1)  # Threads for concurrent Gemini calls
+REQUEST_POOL_SIZE = _int('REQUEST_POOL_SIZE', GEMINI_POOL_SIZE, minimum=1)  # Threads for per-request Gemini tasks and image echo
+GEMINI_TIMEOUT = _float('GEMINI_TIMEOUT', 20, minimum=0.1)  # Seconds per hedged call across all fallback models
+GEMINI_HEDGE_DELAY = _float('GEMINI_HEDGE_DELAY', 3, minimum=0)  # Seconds before also trying the next fallback model
+GEMINI_CIRCUIT_FAILURES = _int('GEMINI_CIRCUIT_FAILURES', 3, minimum=1)  # Consecutive failures that open a model's circuit
+GEMINI_CIRCUIT_RESET = _float('GEMINI_CIRCUIT_RESET', 30, minimum=0)  # Seconds before an open circuit lets a probe through
+
+# Confidence-gated Gemini escalation: only uncertain CNN predictions get an independent Gemini prediction
+ESCALATION_ENABLED = _bool('ESCALATION_ENABLED', True)  # False = always call Gemini
+ESCALATION_MIN_CONFIDENCE = _float('ESCALATION_MIN_CONFIDENCE', 0.9, minimum=0, maximum=1)  # Escalate below this top-1 probability
+ESCALATION_MIN_MARGIN = _float('ESCALATION_MIN_MARGIN', 0.0, minimum=0, maximum=1)  # Escalate below this top-1 minus top-2 gap
+ESCALATION_CLASS_THRESHOLDS = _str('ESCALATION_CLASS_THRESHOLDS', '')  # JSON {"class_id": min_confidence}
+ESCALATION_DEFER_ANALYSIS = _bool('ESCALATION_DEFER_ANALYSIS', True)  # Confident: stored text or background
+
+# Result cache: repeated images (same decoded pixels + model) skip the CNN and Gemini
+RESULT_CACHE_ENABLED = _bool('RESULT_CACHE_ENABLED', True)
+RESULT_CACHE_SIZE = _int('RESULT_CACHE_SIZE', 1024, minimum=1)  # In-memory LRU entries
+RESULT_CACHE_TTL = _int('RESULT_CACHE_TTL', 86400, minimum=0)  # Seconds; 0 = never expire
+RESULT_CACHE_DB = _str('RESULT_CACHE_DB', '')  # Optional SQLite file for the on-disk tier
+RESULT_CACHE_DB_MAX_ENTRIES = _int('RESULT_CACHE_DB_MAX_ENTRIES', 100000, minimum=1)
+
+# Per-class description store: Gemini analyses are generated once per class and reused
+DESCRIPTION_STORE_ENABLED = _bool('DESCRIPTION_STORE_ENABLED', True)
+DESCRIPTION_STORE_PATH = _str('DESCRIPTION_STORE_PATH', str(BASE_DIR / 'class_descriptions.json'))
+DESCRIPTION_REFRESH_INTERVAL = _int('DESCRIPTION_REFRESH_INTERVAL', 0, minimum=0)  # Seconds; 0 = no background refresh
+DESCRIPTION_MAX_AGE = _int('DESCRIPTION_MAX_AGE', 30 * 86400, minimum=0)  # Seconds before a description is refreshed
+
+# Startup / warm-up
+PRELOAD_APP = _bool('PRELOAD_APP', True)  # Import the app once in the gunicorn master
+WARMUP_BATCH_SIZES = _int_list('WARMUP_BATCH_SIZES', '1,32', minimum=1)
+
+# Inference engine: 'compiled' (fixed-signature tf.function with padded batch buckets), 'keras' (Model.predict),
+# or 'tflite' / 'tflite_int8' / 'onnx' to run the export next to MODEL_PATH without TensorFlow (see scripts/export_model.py)
+INFERENCE_ENGINE = _str('INFERENCE_ENGINE', 'compiled', choices=('compiled', 'keras', 'tflite', 'tflite_int8', 'onnx'))
+INFERENCE_BUCKETS = _int_list('INFERENCE_BUCKETS', '1,8,32,128', minimum=1)
+INFERENCE_THREADS = _int('INFERENCE_THREADS', 0, minimum=0) or None  # CPU threads for tflite/onnx; 0 = library default
+
+
+def validate():
+    """Raise ConfigError listing every invalid setting (parse errors, ranges and cross-checks).
+
+    Called once at app startup; scripts that only read a few settings may skip it.
+    """
+    errors = list(_errors)
+    if ESCALATION_CLASS_THRESHOLDS:
+        from escalation import parse_class_thresholds
+        try:
+            thresholds = parse_class_thresholds(ESCALATION_CLASS_THRESHOLDS)
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append(f"ESCALATION_CLASS_THRESHOLDS is not a JSON object of class id -> confidence: {e}")
+        else:
+            out_of_range = {class_id: threshold for class_id, threshold in thresholds.items()
+                            if not 0 <= threshold <= 1}
+            if out_of_range:
+                errors.append(f"ESCALATION_CLASS_THRESHOLDS must be between 0 and 1, got {out_of_range}")
+    if not GEMINI_PREDICTION_MODELS or not GEMINI_ANALYSIS_MODELS:
+        errors.append("GEMINI_PREDICTION_MODELS and GEMINI_ANALYSIS_MODELS need at least one model")
+    from preprocessing import IMAGE_SIZE
+    if 0 < UPLOAD_DECODE_SIZE < max(IMAGE_SIZE):
+        errors.append(f"UPLOAD_DECODE_SIZE ({UPLOAD_DECODE_SIZE}) is smaller than the model input {IMAGE_SIZE}")
+    if GEMINI_HEDGE_DELAY > GEMINI_TIMEOUT:
+        errors.append(f"GEMINI_HEDGE_DELAY ({GEMINI_HEDGE_DELAY}s) exceeds GEMINI_TIMEOUT ({GEMINI_TIMEOUT}s), "
+                      f"so fallback models are never tried")
+    if errors:
+        raise ConfigError('Invalid configuration:\n  ' + '\n  '.join(errors))
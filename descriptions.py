@@ -0,0 +1,177 @@
+"""Persistent per-class store of Gemini sign descriptions.
+
+The detailed analysis shown next to a prediction depends only on the predicted
+class, and there are just 43 of them, so each description is generated once
+(offline with ``scripts/prewarm_descriptions.py`` or on the first request for that
+class) and then served from memory. The store is a small JSON file::
+
+    {"version": 1, "descriptions": {"14": {"sign_name": "Stop", "text": "...",
+                                           "source": "gemini-2.5-flash", "updated_at": 1700000000.0}}}
+
+Several workers share one file: each save takes an exclusive lock on a sidecar
+``<path>.lock`` file, merges in what the others wrote (the newer entry per class
+wins) and then replaces the file atomically, so no worker drops another's entries.
+
+An optional background thread regenerates entries older than a maximum age.
+"""
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves from one process are still serialized by the thread lock
+    fcntl = None
+
+STORE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class DescriptionStore:
+    """In-memory map of class id -> description, persisted to a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._refresh_thread = None
+        self._stop = threading.Event()
+        self.load()
+
+    def load(self):
+        """(Re)load entries from disk; a missing or unreadable file leaves the store empty."""
+        entries = self._read()
+        with self._lock:
+            self._entries = entries
+
+    def _read(self):
+        """Return the entries currently on disk ({} if the file is missing or unreadable)."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            return {int(class_id): entry for class_id, entry in data.get('descriptions', {}).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read description store {self.path}: {e}")
+            return {}
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock on ``<path>.lock`` so only one process saves at a time."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self):
+        """Merge with the file on disk and write it atomically, under a lock shared by all workers.
+
+        Entries written by other workers since the last load are kept (and picked up
+        in memory); where both have an entry for a class, the newer one wins.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._file_lock():
+            on_disk = self._read()
+            with self._lock:
+                for class_id, entry in on_disk.items():
+                    current = self._entries.get(class_id)
+                    if current is None or entry.get('updated_at', 0) > current.get('updated_at', 0):
+                        self._entries[class_id] = entry
+                data = {
+                    'version': STORE_VERSION,
+                    'descriptions': {str(class_id): entry for class_id, entry in sorted(self._entries.items())},
+                }
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.descriptions-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+
+    def get(self, class_id, sign_name):
+        """Return the stored description for ``class_id`` if it was written for ``sign_name``."""
+        entry = self._entries.get(class_id)
+        if entry is not None and entry.get('sign_name') == sign_name:
+            return entry['text']
+        return None
+
+    def put(self, class_id, sign_name, text, source='gemini', persist=True):
+        """Record a freshly generated description and optionally write the store to disk."""
+        with self._lock:
+            self._entries[int(class_id)] = {
+                'sign_name': sign_name,
+                'text': text,
+                'source': source,
+                'updated_at': time.time(),
+            }
+        if persist:
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning(f"Could not write description store {self.path}: {e}")
+
+    def missing_or_stale(self, class_names, max_age=None):
+        """Return {class_id: sign_name} for classes with no entry, a renamed label, or an entry older than ``max_age``."""
+        now = time.time()
+        with self._lock:
+            entries = dict(self._entries)
+        result = {}
+        for class_id, sign_name in class_names.items():
+            entry = entries.get(class_id)
+            if (entry is None or entry.get('sign_name') != sign_name
+                    or (max_age and now - entry.get('updated_at', 0) > max_age)):
+                result[class_id] = sign_name
+        return result
+
+    def refresh(self, class_names, generate_fn, max_age=None):
+        """Regenerate missing/stale descriptions with ``generate_fn(sign_name, class_id) -> (text, source)``.
+
+        Returns:
+            int: Number of descriptions written
+        """
+        written = 0
+        for class_id, sign_name in self.missing_or_stale(class_names, max_age).items():
+            if self._stop.is_set():
+                break
+            text, source = generate_fn(sign_name, class_id)
+            if text:
+                self.put(class_id, sign_name, text, source, persist=False)
+                written += 1
+        if written:
+            self.save()
+        return written
+
+    def start_background_refresh(self, class_names, generate_fn, interval, max_age):
+        """Refresh stale entries every ``interval`` seconds in a daemon thread."""
+        if self._refresh_thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh(class_names, generate_fn, max_age)
+                except Exception as e:
+                    logger.warning(f"Background description refresh failed: {e}")
+
+        self._refresh_thread = threading.Thread(target=run, name='description-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,113 @@
+"""Confidence-gated escalation of CNN predictions to Gemini.
+
+Calling Gemini for an independent prediction on every request costs seconds and
+API spend even when the CNN is 99% sure. ``EscalationPolicy`` looks at the CNN
+probabilities and escalates only uncertain predictions:
+
+- top-1 probability below ``min_confidence`` (optionally overridden per class,
+  e.g. stricter for Stop than for speed limits), or
+- top-1 minus top-2 probability below ``min_margin``.
+
+It also counts how many requests were escalated (by reason) and how often an
+escalation actually changed the answer, so the thresholds can be tuned from
+``/stats``.
+"""
+import json
+import threading
+
+import numpy as np
+
+REASON_LOW_CONFIDENCE = 'low_confidence'
+REASON_LOW_MARGIN = 'low_margin'
+REASON_FORCED = 'forced'
+
+
+def parse_class_thresholds(value):
+    """Parse per-class confidence thresholds from JSON ('{"14": 0.97}') into {class_id: threshold}."""
+    if not value:
+        return {}
+    return {int(class_id): float(threshold) for class_id, threshold in json.loads(value).items()}
+
+
+class EscalationDecision:
+    """Whether one prediction goes to Gemini, and why."""
+
+    __slots__ = ('escalate', 'reason', 'confidence', 'margin')
+
+    def __init__(self, escalate, reason, confidence, margin):
+        self.escalate = escalate
+        self.reason = reason
+        self.confidence = confidence
+        self.margin = margin
+
+    def as_dict(self):
+        return {'escalated': self.escalate, 'reason': self.reason,
+                'confidence': round(self.confidence, 4), 'margin': round(self.margin, 4)}
+
+
+class EscalationPolicy:
+    """Decide which CNN predictions need Gemini, and keep escalation metrics."""
+
+    def __init__(self, min_confidence=0.9, min_margin=0.0, class_thresholds=None, enabled=True):
+        """
+        Args:
+            min_confidence: Escalate when the top-1 probability is below this
+            min_margin: Escalate when top-1 minus top-2 probability is below this (0 = off)
+            class_thresholds: {class_id: min_confidence} overrides for individual classes
+            enabled: False escalates every prediction (the old always-call-Gemini behaviour)
+        """
+        self.min_confidence = float(min_confidence)
+        self.min_margin = float(min_margin)
+        self.class_thresholds = dict(class_thresholds or {})
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._decisions = 0
+        self._escalated = 0
+        self._reasons = {}
+        self._outcomes = 0
+        self._changed = 0
+
+    def decide(self, probabilities):
+        """Return the EscalationDecision for one (C,) probability vector and count it."""
+        top2 = np.partition(probabilities, -2)[-2:] if len(probabilities) > 1 else np.array([0.0, probabilities[0]])
+        predicted_class = int(np.argmax(probabilities))
+        confidence = float(top2[1])
+        margin = float(top2[1] - top2[0])
+
+        reason = None
+        if not self.enabled:
+            reason = REASON_FORCED
+        elif confidence < self.class_thresholds.get(predicted_class, self.min_confidence):
+            reason = REASON_LOW_CONFIDENCE
+        elif margin < self.min_margin:
+            reason = REASON_LOW_MARGIN
+
+        with self._lock:
+            self._decisions += 1
+            if reason is not None:
+                self._escalated += 1
+                self._reasons[reason] = self._reasons.get(reason, 0) + 1
+        return EscalationDecision(reason is not None, reason, confidence, margin)
+
+    def record_outcome(self, changed):
+        """Record whether an escalated prediction ended with a different answer than the CNN's."""
+        with self._lock:
+            self._outcomes += 1
+            if changed:
+                self._changed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'min_confidence': self.min_confidence,
+                'min_margin': self.min_margin,
+                'class_thresholds': len(self.class_thresholds),
+                'decisions': self._decisions,
+                'escalated': self._escalated,
+                'escalation_rate': round(self._escalated / self._decisions, 4) if self._decisions else None,
+                'reasons': dict(self._reasons),
+                'escalations_completed': self._outcomes,
+                'answers_changed': self._changed,
+                'change_rate': round(self._changed / self._outcomes, 4) if self._outcomes else None,
+            }
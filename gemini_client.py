@@ -0,0 +1,365 @@
+"""Concurrent, deadline-bounded calls to Google Gemini.
+
+``generate_hedged`` walks a list of Gemini model names like the old serial loops in
+app.py, but without waiting for each one to time out: the first model is started
+immediately, the next one is started as soon as the previous fails or after a
+short hedge delay, and the first non-empty answer wins. Calls still queued when a
+winner arrives are cancelled; calls already on the wire are abandoned and their
+results ignored.
+
+Every call also feeds a per-model health record. After
+``GEMINI_CIRCUIT_FAILURES`` consecutive failures a model's circuit opens and it is
+skipped; after ``GEMINI_CIRCUIT_RESET`` seconds a single probe call is let through
+(half-open) and its outcome closes or re-opens the circuit. The remaining models
+are tried healthiest first, so during an outage requests fail over (or fail) in
+milliseconds instead of waiting on models that just failed. Healthy models keep
+the configured preference order; their measured latency is reported by
+``health_stats()`` (``/stats``) for tuning ``GEMINI_HEDGE_DELAY``.
+
+``TextStream`` is the streaming counterpart for text shown to users as it is
+generated: models are tried one at a time (healthiest first) until one starts
+answering, and its chunks are handed over as they arrive.
+
+Model handles are built through ``model_factory`` (``genai.GenerativeModel`` by
+default), so a local stub can be swapped in for offline testing::
+
+    gemini_client.model_factory = StubModel  # StubModel(name).generate_content(contents, stream=False)
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import google.generativeai as genai
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Callable mapping a model name to an object with generate_content(contents)
+model_factory = genai.GenerativeModel
+
+# Worker threads for individual Gemini calls; sized so abandoned (slow) calls
+# cannot starve new requests of threads for long. Threads start on the first
+# submit(), so importing this module in a preloading gunicorn master is fork-safe.
+_call_executor = ThreadPoolExecutor(max_workers=config.GEMINI_POOL_SIZE, thread_name_prefix='gemini-call')
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ModelHealth:
+    """Success/latency record and circuit breaker for one Gemini model."""
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure_at = None
+        self.latency = None  # Exponentially weighted seconds per successful call
+        self.opened_at = None
+        self.probing = False
+
+    def allow(self, now):
+        """True if a call may be made now (closed, or the one half-open probe after the reset delay)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def recently_failed(self, now):
+        """True if the last call failed less than ``reset_seconds`` ago (the model is tried after healthy ones)."""
+        return self.consecutive_failures > 0 and now - self.last_failure_at < self.reset_seconds
+
+    def record(self, ok, seconds, now):
+        self.probing = False
+        if ok:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+            self.state = CLOSED
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure_at = now
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"Gemini circuit opened after {self.consecutive_failures} consecutive failures")
+            self.state = OPEN
+            self.opened_at = now
+
+    def as_dict(self):
+        return {
+            'state': self.state,
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'latency_seconds': round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+_health = {}
+_handles = {}
+_health_lock = threading.Lock()
+
+GEMINI_CALLS = metrics.REGISTRY.counter(
+    'traffic_sign_gemini_calls_total', 'Gemini generate_content calls by model and outcome', ('model', 'outcome'))
+GEMINI_CALL_SECONDS = metrics.REGISTRY.histogram(
+    'traffic_sign_gemini_call_seconds', 'Duration of Gemini generate_content calls by model', ('model',))
+_CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+metrics.REGISTRY.gauge_callback(
+    'traffic_sign_gemini_circuit_state', 'Gemini circuit per model (0 closed, 1 half-open, 2 open)',
+    lambda: {(name,): _CIRCUIT_STATES[health['state']] for name, health in health_stats().items()}, ('model',))
+
+
+def _model_health(model_name):
+    """Return the health record for a model, creating it on first use (caller holds _health_lock)."""
+    health = _health.get(model_name)
+    if health is None:
+        health = _health[model_name] = ModelHealth(config.GEMINI_CIRCUIT_FAILURES, config.GEMINI_CIRCUIT_RESET)
+    return health
+
+
+def get_model(model_name):
+    """Return a cached model handle, built with ``model_factory`` on first use."""
+    key = (model_factory, model_name)
+    handle = _handles.get(key)
+    if handle is None:
+        handle = _handles[key] = model_factory(model_name)
+    return handle
+
+
+def ordered_models(model_names):
+    """Return the models that may be called now, healthiest first (preference order breaks ties).
+
+    Open circuits are left out; a model whose reset delay has passed is included once as a probe.
+    Models that failed recently go after the healthy ones until the reset delay passes.
+    Healthy models keep the configured (quality) order: latency is not a ranking signal, since
+    hedging already covers a slow first choice (see ``GEMINI_HEDGE_DELAY``).
+    """
+    now = time.monotonic()
+    with _health_lock:
+        allowed = [(index, name) for index, name in enumerate(model_names) if _model_health(name).allow(now)]
+        ranked = sorted(allowed, key=lambda item: (_health[item[1]].state != CLOSED,
+                                                   _health[item[1]].recently_failed(now), item[0]))
+    return [name for _, name in ranked]
+
+
+def release_probe(model_name):
+    """Give back a half-open probe slot taken by ordered_models() for a model that was never called."""
+    with _health_lock:
+        _model_health(model_name).probing = False
+
+
+def health_stats():
+    """Return {model_name: health dict} for every model called so far."""
+    with _health_lock:
+        return {name: health.as_dict() for name, health in _health.items()}
+
+
+def _call_model(model_name, contents):
+    """Run one generate_content call and return its text (None if the response was empty).
+
+    The outcome is recorded in the model's health even if the caller has stopped waiting.
+    """
+    started = time.monotonic()
+    text = None
+    outcome = 'error'
+    try:
+        response = get_model(model_name).generate_content(contents)
+        if response and hasattr(response, 'text') and response.text:
+            text = response.text
+        outcome = 'success' if text is not None else 'empty'
+        return text
+    finally:
+        _record_call(model_name, outcome, started)
+
+
+def _record_call(model_name, outcome, started):
+    """Record one finished call in the model's health and in the metrics."""
+    now = time.monotonic()
+    with _health_lock:
+        _model_health(model_name).record(outcome == 'success', now - started, now)
+    GEMINI_CALLS.inc(model=model_name, outcome=outcome)
+    GEMINI_CALL_SECONDS.observe(now - started, model=model_name)
+
+
+def generate_hedged(model_names, contents, deadline=None, hedge_delay=None):
+    """Ask several Gemini models for the same content and return the first usable answer.
+
+    Args:
+        model_names: Model names in order of preference
+        contents: Prompt (str) or list of prompt parts / PIL images passed to generate_content
+        deadline: Seconds before giving up on every model (default: config.GEMINI_TIMEOUT)
+        hedge_delay: Seconds to wait on a pending model before also starting the next one
+            (default: config.GEMINI_HEDGE_DELAY)
+
+    Returns:
+        tuple: (model_name, text) from the winning model, or (None, None) if every
+        model failed, had an open circuit, or the deadline passed
+    """
+    deadline = config.GEMINI_TIMEOUT if deadline is None else deadline
+    hedge_delay = config.GEMINI_HEDGE_DELAY if hedge_delay is None else hedge_delay
+
+    give_up_at = time.monotonic() + deadline
+    remaining_names = ordered_models(model_names)
+    if not remaining_names:
+        logger.warning(f"Every Gemini model circuit is open ({', '.join(model_names)})")
+        return None, None
+    pending = {}
+
+    def launch_next():
+        model_name = remaining_names.pop(0)
+        logger.debug(f"Trying Gemini model: {model_name}")
+        pending[_call_executor.submit(_call_model, model_name, contents)] = model_name
+
+    try:
+        while remaining_names or pending:
+            if not pending:
+                launch_next()
+
+            now = time.monotonic()
+            if now >= give_up_at:
+                logger.warning(f"Gemini deadline of {deadline:.1f}s exceeded")
+                return None, None
+
+            # Wake up either when a call finishes or when it is time to hedge
+            timeout = give_up_at - now
+            if remaining_names:
+                timeout = min(timeout, hedge_delay)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if remaining_names:
+                    launch_next()
+                continue
+
+            for future in done:
+                model_name = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as model_error:
+                    logger.warning(f"Model {model_name} failed: {str(model_error)[:100]}")
+                else:
+                    if text:
+                        logger.debug(f"Successfully used model: {model_name}")
+                        return model_name, text
+                    logger.warning(f"Model {model_name} returned an empty response")
+                # Fail over straight away instead of waiting for the hedge delay
+                if remaining_names:
+                    launch_next()
+
+        return None, None
+
+    finally:
+        # Cancel losers that have not started; running ones are abandoned (and still record their health)
+        for future, model_name in pending.items():
+            if future.cancel():
+                release_probe(model_name)
+        for model_name in remaining_names:
+            release_probe(model_name)
+
+
+class TextStream:
+    """Text of one generate_content call, streamed from the first model that starts answering.
+
+    The call starts on construction, in the Gemini call pool, so it can run alongside
+    other work; iterate to receive text chunks as they arrive, or close() to abandon it.
+    A model failing before its first chunk fails over to the next one; once text has
+    been handed out the stream stays with that model, and a failure then ends it early
+    (``complete`` stays False).
+    """
+
+    _DONE = object()
+
+    def __init__(self, model_names, contents, deadline=None):
+        """
+        Args:
+            model_names: Model names in order of preference
+            contents: Prompt (str) or list of prompt parts / PIL images passed to generate_content
+            deadline: Seconds before the whole stream is given up (default: config.GEMINI_TIMEOUT)
+        """
+        self.contents = contents
+        self.deadline = config.GEMINI_TIMEOUT if deadline is None else deadline
+        self.give_up_at = time.monotonic() + self.deadline
+        self.model_name = None
+        self.complete = False
+        self._ok = False
+        self._queue = queue.Queue()
+        self._closed = threading.Event()
+        self._model_names = ordered_models(model_names)
+        self._future = None
+        if not self._model_names:
+            logger.warning(f"Every Gemini model circuit is open ({', '.join(model_names)})")
+            self._queue.put(self._DONE)
+        else:
+            self._future = _call_executor.submit(self._produce)
+
+    def _produce(self):
+        remaining_names = list(self._model_names)
+        try:
+            while remaining_names and not self._closed.is_set():
+                model_name = remaining_names.pop(0)
+                logger.debug(f"Streaming from Gemini model: {model_name}")
+                started = time.monotonic()
+                received = ok = abandoned = False
+                try:
+                    for chunk in get_model(model_name).generate_content(self.contents, stream=True):
+                        if self._closed.is_set():
+                            abandoned = True
+                            break
+                        text = chunk.text
+                        if text:
+                            received = True
+                            self._queue.put((model_name, text))
+                    else:
+                        ok = received
+                except Exception as model_error:
+                    logger.warning(f"Model {model_name} failed: {str(model_error)[:100]}")
+                finally:
+                    if abandoned:
+                        # Stopped by the caller: says nothing about the model's health
+                        release_probe(model_name)
+                    else:
+                        _record_call(model_name, 'success' if ok else 'error', started)
+                if ok:
+                    logger.debug(f"Successfully streamed from model: {model_name}")
+                    self._ok = True
+                if received:
+                    break
+        finally:
+            for model_name in remaining_names:
+                release_probe(model_name)
+            self._queue.put(self._DONE)
+
+    def __iter__(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=max(self.give_up_at - time.monotonic(), 0))
+            except queue.Empty:
+                logger.warning(f"Gemini deadline of {self.deadline:.1f}s exceeded")
+                self.close()
+                return
+            if item is self._DONE:
+                self.complete = self._ok
+                return
+            self.model_name, text = item
+            yield text
+
+    def close(self):
+        """Stop the stream; a call that has not started yet is cancelled."""
+        self._closed.set()
+        if self._future is not None and self._future.cancel():
+            for model_name in self._model_names:
+                release_probe(model_name)
@@ -0,0 +1,20 @@
+"""Gunicorn settings for the Traffic Sign Classifier.
+
+Used by the Procfile and Dockerfile via ``gunicorn -c gunicorn.conf.py app:app``.
+Bind address, worker count and timeout stay on the command line.
+
+With PRELOAD_APP the Flask app, sign names and other fork-safe state are imported
+once in the master and shared copy-on-write with the workers. TensorFlow is not
+fork-safe, so the model is loaded (and warmed up when EAGER_LOAD_MODEL is set) in
+each worker after fork, before it starts accepting requests.
+"""
+from config import PRELOAD_APP
+
+preload_app = PRELOAD_APP
+
+
+def post_worker_init(worker):
+    import app
+
+    app.init_worker()
+    worker.log.info("Worker %s initialised (warm=%s)", worker.pid, app.startup['warm'])
@@ -0,0 +1,85 @@
+"""How /predict echoes the uploaded image back to the client.
+
+Re-encoding the full-resolution upload as PNG and base64-embedding it often cost
+more CPU than the CNN and made responses several MB, although the browser
+already has the file. The echo is now one of:
+
+- ``none``: no image in the response (the client shows its own copy);
+- ``thumbnail``: a small JPEG/WebP (longest side bounded) as base64 ``image_data``;
+- ``url``: the original upload bytes are stored once under ``static/uploads``,
+  named by content hash, and returned as ``image_url``;
+- ``png``: the old base64 PNG of the decoded image, for clients that still need it.
+
+Encoding runs off the request thread (the caller submits ``echo_fields`` to an
+executor alongside the CNN and Gemini work).
+"""
+import base64
+import hashlib
+import os
+from io import BytesIO
+
+MODES = ('none', 'thumbnail', 'url', 'png')
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+    'PNG': 'image/png',
+}
+
+EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+}
+
+
+def encode_base64(image, image_format='PNG', **save_args):
+    """Encode a PIL image in ``image_format`` and return it as a base64 string."""
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **save_args)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def encode_thumbnail(image, max_size=256, image_format='JPEG', quality=80):
+    """Return a base64 thumbnail whose longest side is at most ``max_size`` pixels."""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((max_size, max_size))
+    return encode_base64(thumbnail, image_format, quality=quality)
+
+
+def save_upload(data, folder, image_format=None):
+    """Store raw upload bytes under a content-hash name (written once) and return the file name."""
+    name = hashlib.sha256(data).hexdigest()[:32] + EXTENSIONS.get(image_format, '.img')
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return name
+
+
+def echo_fields(mode, image, data=None, image_format=None, folder='static/uploads', url_prefix='/static/uploads/',
+                thumbnail_size=256, thumbnail_format='JPEG'):
+    """Build the response fields that echo the uploaded image.
+
+    Args:
+        mode: One of MODES
+        image: Decoded PIL image
+        data: Raw upload bytes (needed for 'url')
+        image_format: PIL format of the upload ('JPEG', 'PNG'), used for the stored file's extension
+        folder: Directory served at ``url_prefix`` where 'url' uploads are stored
+        url_prefix: URL path of ``folder``
+        thumbnail_size: Longest side of 'thumbnail' images in pixels
+        thumbnail_format: 'JPEG' or 'WEBP'
+
+    Returns:
+        dict: Fields to merge into the /predict response (empty for 'none')
+    """
+    if mode == 'thumbnail':
+        return {'image_data': encode_thumbnail(image, thumbnail_size, thumbnail_format),
+                'image_mime': MIME_TYPES[thumbnail_format]}
+    if mode == 'url':
+        return {'image_url': url_prefix + save_upload(data, folder, image_format)}
+    if mode == 'png':
+        return {'image_data': encode_base64(image), 'image_mime': MIME_TYPES['PNG']}
+    return {}
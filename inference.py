@@ -0,0 +1,244 @@
+"""CNN inference engines for the traffic-sign model.
+
+``keras.Model.predict`` builds a data adapter, callbacks and a progress bar on
+every call, which costs far more than the forward pass of a tiny 32x32 CNN.
+``InferenceEngine`` calls the model through a ``tf.function`` traced once with a
+fixed input signature, and pads batches up to a small set of bucket sizes so the
+steady state always reuses the same shapes.
+
+On CPU-only nodes the model can instead be served from an exported artifact
+(see ``scripts/export_model.py``) without importing TensorFlow at all:
+``TFLiteEngine`` runs a ``.tflite`` file (float32, or the int8-quantized
+``.int8.tflite``) with the ``tflite_runtime`` interpreter and ``OnnxEngine`` runs
+a ``.onnx`` file with ONNX Runtime.
+
+This module has no Flask or Gemini dependency so offline tools can use it.
+TensorFlow and the interpreters are imported lazily, only when a model is loaded.
+"""
+import abc
+import os
+import threading
+
+import numpy as np
+
+INPUT_SHAPE = (32, 32, 3)
+DEFAULT_BUCKETS = (1, 8, 32, 128)
+
+# Engines and the extension of the exported artifact each one loads (None = the Keras model itself)
+ENGINE_EXTENSIONS = {
+    'compiled': None,
+    'keras': None,
+    'tflite': '.tflite',
+    'tflite_int8': '.int8.tflite',
+    'onnx': '.onnx',
+}
+
+
+def load_keras_model(model_path):
+    """Load the Keras model from an .h5 file (TensorFlow is imported here, not at module import)."""
+    # import TensorFlow locally to avoid heavy initialization on module import/py_compile
+    import tensorflow as tf
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Model file not found: {model_path}\nPlease place your 'traffic-sign.h5' file in the project root."
+        )
+    return tf.keras.models.load_model(model_path, compile=False)
+
+
+def artifact_path(model_path, engine):
+    """Return the file an engine loads for a given .h5 model path (e.g. traffic-sign.tflite for 'tflite')."""
+    if engine not in ENGINE_EXTENSIONS:
+        raise ValueError(f"Unknown inference engine: {engine!r} (expected one of {', '.join(ENGINE_EXTENSIONS)})")
+    extension = ENGINE_EXTENSIONS[engine]
+    return model_path if extension is None else os.path.splitext(model_path)[0] + extension
+
+
+class _BucketedEngine(abc.ABC):
+    """Shared ``predict`` for engines that run fixed, padded batch sizes.
+
+    Subclasses set ``buckets``, ``input_shape`` and ``output_shape`` and implement
+    ``_run(batch)`` for one padded float32 batch.
+    """
+
+    buckets = DEFAULT_BUCKETS
+    input_shape = INPUT_SHAPE
+    output_shape = ()
+
+    @abc.abstractmethod
+    def _run(self, batch):
+        """Return the engine's probabilities for one padded float32 batch of a bucket size."""
+
+    def _bucket_for(self, size):
+        for bucket in self.buckets:
+            if size <= bucket:
+                return bucket
+        return self.buckets[-1]
+
+    def predict(self, batch, verbose=0):
+        """Return class probabilities for a float32 (N, 32, 32, 3) batch as a NumPy array.
+
+        ``verbose`` is accepted (and ignored) so the engine is a drop-in for ``Model.predict``.
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        total = len(batch)
+        largest = self.buckets[-1]
+        outputs = []
+        for start in range(0, total, largest):
+            chunk = batch[start:start + largest]
+            size = len(chunk)
+            bucket = self._bucket_for(size)
+            if size < bucket:
+                padded = np.zeros((bucket,) + chunk.shape[1:], dtype=np.float32)
+                padded[:size] = chunk
+                chunk = padded
+            outputs.append(self._run(chunk)[:size])
+        if not outputs:
+            return np.empty((0,) + tuple(self.output_shape), dtype=np.float32)
+        return outputs[0] if len(outputs) == 1 else np.concatenate(outputs)
+
+    def warm_up(self):
+        """Run every bucket shape once so the first real call does no tracing or allocation."""
+        for bucket in self.buckets:
+            self._run(np.zeros((bucket,) + self.input_shape, dtype=np.float32))
+
+
+class InferenceEngine(_BucketedEngine):
+    """Fixed-signature, bucket-padded wrapper exposing the same ``predict`` call as a Keras model."""
+
+    def __init__(self, keras_model, buckets=DEFAULT_BUCKETS):
+        import tensorflow as tf
+
+        self.model = keras_model
+        self.buckets = tuple(sorted(set(int(bucket) for bucket in buckets)))
+        self.input_shape = tuple(keras_model.input_shape[1:]) if keras_model.input_shape else INPUT_SHAPE
+        self.output_shape = tuple(keras_model.output_shape[1:])
+        self._forward = tf.function(
+            lambda x: keras_model(x, training=False),
+            input_signature=[tf.TensorSpec(shape=(None,) + self.input_shape, dtype=tf.float32)],
+        )
+
+    def _run(self, batch):
+        return self._forward(batch).numpy()
+
+
+def _tflite_interpreter_class():
+    """Return the TFLite ``Interpreter`` class, preferring the standalone tflite_runtime package."""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        # Full TensorFlow also ships the interpreter; slower to import but always available in dev
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteEngine(_BucketedEngine):
+    """Run a .tflite export with the lightweight TFLite interpreter.
+
+    The interpreter keeps one set of tensors at a time, so it is resized only when
+    the padded bucket changes, and calls are serialised because it is not thread-safe.
+    """
+
+    def __init__(self, tflite_path, buckets=DEFAULT_BUCKETS, num_threads=None):
+        if not os.path.exists(tflite_path):
+            raise FileNotFoundError(
+                f"TFLite model not found: {tflite_path}\nExport it with: python scripts/export_model.py --format tflite (or tflite_int8)"
+            )
+        Interpreter = _tflite_interpreter_class()
+        self.interpreter = Interpreter(model_path=tflite_path, num_threads=num_threads)
+        self.buckets = tuple(sorted(set(int(bucket) for bucket in buckets)))
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._output_index = output_details['index']
+        self.input_shape = tuple(int(dim) for dim in input_details['shape'][1:])
+        self.output_shape = tuple(int(dim) for dim in output_details['shape'][1:])
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    def _run(self, batch):
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self.interpreter.set_tensor(self._input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output_index).copy()
+
+
+class OnnxEngine(_BucketedEngine):
+    """Run a .onnx export with ONNX Runtime on the CPU execution provider."""
+
+    def __init__(self, onnx_path, buckets=DEFAULT_BUCKETS, num_threads=None):
+        import onnxruntime as ort
+
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"ONNX model not found: {onnx_path}\nExport it with: python scripts/export_model.py --format onnx"
+            )
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.buckets = tuple(sorted(set(int(bucket) for bucket in buckets)))
+        model_input = self.session.get_inputs()[0]
+        model_output = self.session.get_outputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = tuple(dim if isinstance(dim, int) else size
+                                 for dim, size in zip(model_input.shape[1:], INPUT_SHAPE))
+        self.output_shape = tuple(dim for dim in model_output.shape[1:] if isinstance(dim, int))
+
+    def _run(self, batch):
+        return self.session.run(None, {self._input_name: batch})[0]
+
+
+def top_k(probabilities, k):
+    """Return the ``k`` most probable classes of every row, best first.
+
+    Uses ``argpartition`` (O(C) per row) and then sorts only the ``k`` winners,
+    instead of fully sorting all 43 probabilities.
+
+    Args:
+        probabilities: (N, C) array of class probabilities
+        k: Number of classes per row (clipped to C)
+
+    Returns:
+        tuple: ((N, k) class ids, (N, k) probabilities)
+    """
+    probabilities = np.asarray(probabilities)
+    num_classes = probabilities.shape[1]
+    k = max(1, min(int(k), num_classes))
+    if k < num_classes:
+        class_ids = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    else:
+        class_ids = np.broadcast_to(np.arange(num_classes), probabilities.shape)
+    top = np.take_along_axis(probabilities, class_ids, axis=1)
+    order = np.argsort(-top, axis=1, kind='stable')
+    return np.take_along_axis(class_ids, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def load_engine(model_path, engine='compiled', buckets=DEFAULT_BUCKETS, num_threads=None):
+    """Load the model behind the requested inference engine.
+
+    Args:
+        model_path: Path to the Keras .h5 model; exported engines load the file
+            next to it (see ``artifact_path``)
+        engine: 'compiled' for InferenceEngine, 'keras' for the plain Keras model (Model.predict),
+            'tflite' / 'tflite_int8' for TFLiteEngine or 'onnx' for OnnxEngine
+        buckets: Padded batch sizes used by every engine except 'keras'
+        num_threads: CPU threads for the TFLite and ONNX interpreters (None = library default)
+
+    Returns:
+        An object with ``predict(batch, verbose=0) -> probabilities``
+    """
+    path = artifact_path(model_path, engine)
+    if engine in ('tflite', 'tflite_int8'):
+        return TFLiteEngine(path, buckets, num_threads)
+    if engine == 'onnx':
+        return OnnxEngine(path, buckets, num_threads)
+    keras_model = load_keras_model(path)
+    if engine == 'keras':
+        return keras_model
+    return InferenceEngine(keras_model, buckets)
@@ -0,0 +1,67 @@
+"""Class-id to sign-name registry for the traffic-sign model.
+
+The 43 sign names are read once at startup (with the stdlib ``csv`` module, so the
+serving path does not import pandas) into a tuple indexed by class id. Matching
+free text back to these names is ``sign_matcher.SignMatcher``'s job.
+
+A model can ship its own label set: ``traffic-sign.labels.csv`` next to
+``traffic-sign.h5`` takes precedence over ``SIGNNAME_CSV``. Each label set has a
+content-hash version, which is folded into the model version so cached results
+never outlive the labels they were named with.
+"""
+import csv
+import hashlib
+import os
+
+UNKNOWN_SIGN = "Unknown traffic sign"
+
+
+class LabelSet:
+    """Immutable, class-id indexed sign names."""
+
+    def __init__(self, names, version='unversioned', source=None):
+        """
+        Args:
+            names: Sign names in class-id order
+            version: Identifier of this label set (content hash for files)
+            source: Where the names were loaded from, for diagnostics
+        """
+        self.names = tuple(names)
+        self.version = version
+        self.source = source
+        self.by_name = {name: class_id for class_id, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def name(self, class_id, default=UNKNOWN_SIGN):
+        """Return the sign name for a class id, or ``default`` if it is out of range."""
+        if 0 <= class_id < len(self.names):
+            return self.names[class_id]
+        return default
+
+    def as_dict(self):
+        """Return {class_id: sign_name} for every class."""
+        return dict(enumerate(self.names))
+
+
+def labels_path(model_path, default_path):
+    """Return the label file shipped with the model (``<model>.labels.csv``) if present, else ``default_path``."""
+    model_labels = os.path.splitext(model_path)[0] + '.labels.csv'
+    return model_labels if os.path.exists(model_labels) else default_path
+
+
+def load_labels(path):
+    """Load a ``ClassId,SignName`` CSV into a LabelSet.
+
+    Raises:
+        ValueError: If the class ids are not exactly 0..N-1
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    rows = csv.DictReader(content.decode('utf-8-sig').splitlines())
+    names = {int(row['ClassId']): row['SignName'].strip() for row in rows}
+    if sorted(names) != list(range(len(names))):
+        raise ValueError(f"Class ids in {path} must be contiguous from 0 (got {len(names)} rows)")
+    version = hashlib.sha256(content).hexdigest()[:12]
+    return LabelSet((names[class_id] for class_id in range(len(names))), version=version, source=path)
@@ -0,0 +1,195 @@
+"""Multi-process decode -> single inference process pipeline for bulk classification.
+
+Decoding and resizing with PIL holds the GIL, while the CNN wants large batches.
+``DecodePipeline`` splits the work into three stages:
+
+- N decoder processes decode images straight into 32x32x3 uint8 slots of a ring
+  of batch buffers in ``multiprocessing.shared_memory``;
+- one inference process waits until a buffer is complete, converts it to the
+  normalized float32 batch the model needs (the only copy; pixels never go
+  through a pipe), hands the buffer back to the decoders and runs the model;
+- the caller, as the writer stage, iterates over the per-batch results.
+
+Backpressure comes from the ring: at most ``ring_size`` batches are being decoded
+or waiting for inference, and at most two finished batches wait for the writer,
+so a slow stage stalls the ones before it instead of growing memory.
+
+Results come back in input order. The inference engine is built inside the
+inference process by ``engine_factory`` (e.g. a ``functools.partial`` of
+``inference.load_engine``), so the parent never imports TensorFlow.
+"""
+import multiprocessing
+import queue
+import threading
+import traceback
+from io import BytesIO
+from itertools import islice
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import preprocessing
+
+SLOT_SHAPE = (preprocessing.IMAGE_SIZE[1], preprocessing.IMAGE_SIZE[0], preprocessing.CHANNELS)
+
+
+def _attach(shm_name, shape):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    return shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _decoder(shm_name, shape, tasks, completions, draft):
+    """Decoder process: decode (buffer, row, payload) tasks into their shared-memory slot."""
+    shm, slots = _attach(shm_name, shape)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            buffer, row, payload = task
+            try:
+                image_file = BytesIO(payload) if isinstance(payload, bytes) else payload
+                image = preprocessing.open_image(image_file, preprocessing.IMAGE_SIZE, draft)
+                preprocessing.write_row(image, slots[buffer, row], preprocessing.IMAGE_SIZE)
+                completions.put((buffer, row, None))
+            except Exception as e:
+                completions.put((buffer, row, str(e)))
+    finally:
+        del slots
+        shm.close()
+
+
+def _inference(shm_name, shape, engine_factory, batches, completions, free_buffers, results):
+    """Inference process: run each completed buffer through the model, in batch order."""
+    shm, slots = _attach(shm_name, shape)
+    try:
+        engine = engine_factory()
+        finished = {}  # buffer -> {row: error or None}, filled as decoders report
+        while True:
+            item = batches.get()
+            if item is None:
+                results.put(None)
+                return
+            buffer, count = item
+            while len(finished.get(buffer, ())) < count:
+                done_buffer, row, error = completions.get()
+                finished.setdefault(done_buffer, {})[row] = error
+            outcome = finished.pop(buffer)
+
+            rows = [row for row in range(count) if outcome[row] is None]
+            errors = {row: error for row, error in outcome.items() if error is not None}
+            batch = preprocessing.empty_batch(len(rows))
+            batch[...] = slots[buffer, :count] if len(rows) == count else slots[buffer, rows]
+            free_buffers.put(buffer)  # pixels copied: decoders can refill it while the model runs
+
+            if rows:
+                probabilities = engine.predict(preprocessing.normalize(batch), verbose=0)
+            else:
+                probabilities = np.empty((0, 0), dtype=np.float32)
+            results.put((rows, errors, np.asarray(probabilities)))
+    except Exception:
+        results.put(('error', traceback.format_exc()))
+    finally:
+        del slots
+        shm.close()
+
+
+class DecodePipeline:
+    """Decoder processes -> shared-memory batch ring -> one inference process -> caller."""
+
+    def __init__(self, engine_factory, batch_size=256, decoders=4, ring_size=4, draft=True):
+        """
+        Args:
+            engine_factory: Picklable callable returning an object with ``predict(batch, verbose=0)``;
+                called once, in the inference process
+            batch_size: Images per batch buffer (and per forward pass)
+            decoders: Decoder processes
+            ring_size: Batch buffers in shared memory, i.e. batches in flight
+            draft: Use reduced JPEG decoding
+        """
+        self.engine_factory = engine_factory
+        self.batch_size = max(1, int(batch_size))
+        self.decoders = max(1, int(decoders))
+        self.ring_size = max(2, int(ring_size))
+        self.draft = draft
+
+    def run(self, items):
+        """Classify (source, payload) items, where payload is a path or the encoded image bytes.
+
+        Yields, per batch in input order:
+            tuple: (sources, rows, errors, probabilities) where ``rows`` are the indices into
+                ``sources`` of the decoded images (the rows of ``probabilities``) and ``errors``
+                maps the other indices to their decoding error
+
+        Raises:
+            RuntimeError: If the inference process fails or a pipeline process dies
+        """
+        shape = (self.ring_size, self.batch_size) + SLOT_SHAPE
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        context = multiprocessing.get_context()
+        tasks = context.Queue(maxsize=self.ring_size * self.batch_size)
+        completions = context.Queue()
+        batches = context.Queue()
+        free_buffers = context.Queue()
+        results = context.Queue(maxsize=2)
+        for buffer in range(self.ring_size):
+            free_buffers.put(buffer)
+
+        processes = [context.Process(target=_decoder, name=f'decoder-{index}', daemon=True,
+                                     args=(shm.name, shape, tasks, completions, self.draft))
+                     for index in range(self.decoders)]
+        processes.append(context.Process(target=_inference, name='inference', daemon=True,
+                                         args=(shm.name, shape, self.engine_factory, batches, completions,
+                                               free_buffers, results)))
+        for process in processes:
+            process.start()
+
+        # Sources of the batches in flight, in order; the feeder runs in a thread of this process
+        batch_sources = queue.Queue()
+        feed_error = []
+
+        def feed():
+            try:
+                items_iter = iter(items)
+                while True:
+                    chunk = list(islice(items_iter, self.batch_size))
+                    if not chunk:
+                        return
+                    buffer = free_buffers.get()  # blocks while every buffer is in flight
+                    batch_sources.put([source for source, _ in chunk])
+                    batches.put((buffer, len(chunk)))
+                    for row, (_, payload) in enumerate(chunk):
+                        tasks.put((buffer, row, payload))
+            except Exception as e:
+                feed_error.append(e)
+            finally:
+                batches.put(None)
+                for _ in range(self.decoders):
+                    tasks.put(None)
+
+        feeder = threading.Thread(target=feed, name='pipeline-feeder', daemon=True)
+        feeder.start()
+        try:
+            while True:
+                try:
+                    item = results.get(timeout=1.0)
+                except queue.Empty:
+                    dead = [process.name for process in processes if not process.is_alive() and process.exitcode]
+                    if dead:
+                        raise RuntimeError(f"Pipeline process(es) died: {', '.join(dead)}")
+                    continue
+                if item is None:
+                    break
+                if item[0] == 'error':
+                    raise RuntimeError(f"Inference process failed:\n{item[1]}")
+                rows, errors, probabilities = item
+                yield batch_sources.get(), rows, errors, probabilities
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join(timeout=5)
+            shm.close()
+            shm.unlink()
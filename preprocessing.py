@@ -0,0 +1,225 @@
+"""Image preprocessing for the traffic-sign CNN.
+
+The model only needs a 32x32 RGB image scaled to [0, 1]. The naive path
+(``Image.open().convert("RGB").resize()`` then ``np.array``, ``expand_dims``,
+``astype`` and ``/ 255.0``) decodes the full-resolution image and allocates
+several full-size copies per request. Here:
+
+- JPEGs are decoded in draft mode, letting libjpeg scale by 1/2, 1/4 or 1/8
+  during the DCT so a 4000px photo is never fully decoded;
+- resized pixels are written straight into a row of a preallocated float32
+  batch, with no intermediate float arrays;
+- the batch is normalized once, in place.
+
+Shared by /predict, /predict_batch, the export/benchmark scripts and the test
+scripts, which all resize and normalize the same way. They do not decode the same
+way, so the model input can differ slightly between paths:
+
+- /predict (``open_upload``) decodes at ``UPLOAD_DECODE_SIZE`` (about 1024px, the
+  image Gemini and the result cache also use) and then resizes to 32x32;
+- /predict_batch, scripts/classify_bulk.py and the test scripts (``open_image`` /
+  ``load_batch`` with draft=True) let libjpeg scale straight towards 32x32.
+
+Both resample with the same filter but from different intermediate sizes; on
+tests/speed-limit-sign-30-km-h.jpg the inputs differ by up to 0.125 per pixel (mean
+0.015). With draft=False (JPEG_DRAFT_DECODE=false for /predict_batch) images no larger
+than UPLOAD_DECODE_SIZE get exactly the /predict input.
+"""
+import glob
+import math
+import os
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+# Model input (width, height). Deliberately not read from config: this module is
+# imported by tools that set the environment afterwards, before importing config.
+IMAGE_SIZE = (32, 32)
+CHANNELS = 3
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+IMAGE_PATTERNS = tuple('*' + extension for extension in IMAGE_EXTENSIONS)
+# Leading bytes of the accepted upload formats
+IMAGE_SIGNATURES = ((b'\xff\xd8\xff', 'JPEG'), (b'\x89PNG\r\n\x1a\n', 'PNG'))
+
+
+class ImageRejected(ValueError):
+    """An upload that is not an accepted image or is too large to decode."""
+
+
+def open_image(image_file, size=IMAGE_SIZE, draft=True):
+    """Open an image for the CNN, letting JPEG decoding downscale towards ``size``.
+
+    Args:
+        image_file: Path or file object
+        size: Target (width, height); draft decoding never goes below it
+        draft: Use reduced JPEG decoding (no effect on other formats)
+
+    Returns:
+        PIL.Image: The decoded RGB image, at least ``size`` large when draft mode applies
+    """
+    image = Image.open(image_file)
+    if draft and image.format == 'JPEG':
+        image.draft('RGB', size)
+    return image.convert("RGB")
+
+
+def write_row(image, out, size=IMAGE_SIZE):
+    """Resize an RGB PIL image and write its pixels (0-255) into one float32 ``out`` row in place."""
+    if image.size != size:
+        image = image.resize(size)
+    out[...] = np.asarray(image)
+
+
+def normalize(batch):
+    """Scale a float32 batch of 0-255 pixels to [0, 1] in place and return it."""
+    batch *= np.float32(1.0 / 255.0)
+    return batch
+
+
+def empty_batch(count, size=IMAGE_SIZE):
+    """Allocate an uninitialised float32 (count, height, width, 3) batch."""
+    return np.empty((count, size[1], size[0], CHANNELS), dtype=np.float32)
+
+
+def image_to_array(image, size=IMAGE_SIZE):
+    """Preprocess an already decoded PIL image into a normalized float32 (32, 32, 3) array."""
+    batch = empty_batch(1, size)
+    write_row(image.convert("RGB") if image.mode != "RGB" else image, batch[0], size)
+    return normalize(batch)[0]
+
+
+def load_batch(image_files, size=IMAGE_SIZE, draft=True, max_images=None):
+    """Decode many images into one normalized float32 batch.
+
+    Undecodable images are skipped and reported instead of failing the batch.
+    With ``max_images`` the inputs are consumed lazily (e.g. archive members) into
+    a batch of that capacity; untouched rows of ``np.empty`` cost no memory.
+
+    Args:
+        image_files: Iterable of paths or file objects
+        size: Model input (width, height)
+        draft: Use reduced JPEG decoding
+        max_images: Largest accepted batch (None = all of ``image_files``)
+
+    Returns:
+        tuple: (batch, rows, errors) where ``rows[i]`` is the input index of batch row i
+            and ``errors`` maps input index to the decoding error message (without the file name)
+
+    Raises:
+        ValueError: If there are more than ``max_images`` inputs
+    """
+    if max_images is None:
+        image_files = list(image_files)
+        max_images = len(image_files)
+    batch = empty_batch(max_images, size)
+    rows = []
+    errors = {}
+    for index, image_file in enumerate(image_files):
+        if index >= max_images:
+            raise ValueError(f"Too many images in batch (max {max_images})")
+        try:
+            write_row(open_image(image_file, size, draft), batch[len(rows)], size)
+            rows.append(index)
+        except UnidentifiedImageError:
+            # Pillow's message embeds the file object's repr, which means nothing to callers
+            errors[index] = 'not a supported image'
+        except Exception as e:
+            errors[index] = str(e)
+    return normalize(batch[:len(rows)]), rows, errors
+
+
+def load_image(image_file, size=IMAGE_SIZE, draft=True):
+    """Decode one image into a normalized float32 (32, 32, 3) array."""
+    batch = empty_batch(1, size)
+    write_row(open_image(image_file, size, draft), batch[0], size)
+    return normalize(batch)[0]
+
+
+def find_images(directory):
+    """Return the image files under ``directory`` (recursively), sorted for reproducible runs."""
+    paths = []
+    for pattern in IMAGE_PATTERNS:
+        paths.extend(glob.glob(os.path.join(directory, '**', pattern), recursive=True))
+    return sorted(paths)
+
+
+def sniff_format(stream):
+    """Return the format named by the first bytes of a seekable stream ('JPEG', 'PNG') or None.
+
+    The stream position is left unchanged.
+    """
+    position = stream.tell()
+    head = stream.read(8)
+    stream.seek(position)
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    return None
+
+
+def check_upload(stream, max_pixels=0):
+    """Check an upload's format from its magic bytes and its dimensions from its header.
+
+    Only the header is read; no pixel is decoded.
+
+    Args:
+        stream: Seekable file object positioned at the start of the image
+        max_pixels: Largest accepted width x height (0 = no limit beyond Pillow's own)
+
+    Returns:
+        tuple: (lazily opened PIL image, format)
+
+    Raises:
+        ImageRejected: For an unsupported format, an unreadable header or too many pixels
+    """
+    image_format = sniff_format(stream)
+    if image_format is None:
+        raise ImageRejected('Invalid file type. Use PNG, JPG, or JPEG.')
+    try:
+        image = Image.open(stream, formats=(image_format,))
+    except Image.DecompressionBombError as e:
+        raise ImageRejected(f"Image too large: {e}") from e
+    except (UnidentifiedImageError, OSError, SyntaxError) as e:
+        # Magic bytes but no readable header (garbage or truncated upload)
+        raise ImageRejected(f"Cannot read {image_format} image.") from e
+    width, height = image.size
+    if max_pixels and width * height > max_pixels:
+        raise ImageRejected(f"Image too large: {width}x{height} pixels (max {max_pixels:,}).")
+    return image, image_format
+
+
+def open_upload(stream, max_pixels=0, decode_size=0):
+    """Validate and decode an uploaded image straight from its stream, with bounded memory.
+
+    The upload is first checked with check_upload(), before any pixel is decoded.
+    JPEGs are then decoded in draft mode at the smallest DCT scale that keeps the
+    longest side >= ``decode_size``, and the result is shrunk to fit ``decode_size``,
+    so a 48 MP phone photo never exists at full size.
+
+    Args:
+        stream: Seekable file object positioned at the start of the image
+        max_pixels: Largest accepted width x height (0 = no limit beyond Pillow's own)
+        decode_size: Longest side to decode at (0 = full size)
+
+    Returns:
+        tuple: (RGB PIL image, format)
+
+    Raises:
+        ImageRejected: For an unsupported format, too many pixels or undecodable pixel data
+    """
+    image, image_format = check_upload(stream, max_pixels)
+    try:
+        if decode_size and image_format == 'JPEG':
+            # draft() keeps both sides >= the requested size, so request the image's own
+            # aspect ratio scaled to a longest side of decode_size
+            width, height = image.size
+            scale = decode_size / max(width, height)
+            if scale < 1:
+                image.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+        image = image.convert('RGB')
+    except (OSError, SyntaxError, ValueError) as e:
+        # Valid header, broken pixel data (e.g. "image file is truncated")
+        raise ImageRejected(f"Cannot decode {image_format} image: {e}") from e
+    if decode_size and max(image.size) > decode_size:
+        image.thumbnail((decode_size, decode_size))
+    return image, image_format
@@ -0,0 +1,136 @@
+"""Content-addressed cache of /predict results.
+
+Entries are keyed by a hash of the decoded RGB pixels plus the model version, so
+re-uploads of the same sign (whatever the filename or container format) are served
+without running the CNN or calling Gemini. An in-memory LRU sits in front of an
+optional SQLite tier that survives restarts and is shared by gunicorn workers.
+Both tiers evict by age (TTL) and by entry count.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def image_key(image, model_version):
+    """Return the cache key for a decoded PIL image under a given model version."""
+    digest = hashlib.sha256()
+    digest.update(f"{model_version}|{image.mode}|{image.size[0]}x{image.size[1]}|".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional SQLite) cache of JSON-serializable results."""
+
+    def __init__(self, max_entries=1024, ttl=86400, db_path=None, db_max_entries=100000):
+        """
+        Args:
+            max_entries: Entries kept in the in-memory LRU
+            ttl: Seconds an entry stays valid in either tier (0 disables expiry)
+            db_path: SQLite file for the on-disk tier, or None for memory only
+            db_max_entries: Entries kept on disk before the oldest are evicted
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_max_entries = db_max_entries
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._counters = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'writes': 0}
+
+        # SQLite connections must not cross fork(), so connect lazily per process
+        self.db_path = db_path
+        self._db_connection = None
+        self._db_pid = None
+
+    @property
+    def _db(self):
+        if not self.db_path:
+            return None
+        if self._db_connection is None or self._db_pid != os.getpid():
+            self._db_connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._db_pid = os.getpid()
+            self._db_connection.execute('PRAGMA journal_mode=WAL')
+            self._db_connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, stored_at REAL, value TEXT)'
+            )
+            self._db_connection.execute('CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)')
+        return self._db_connection
+
+    def _expired(self, stored_at, now):
+        return self.ttl > 0 and now - stored_at > self.ttl
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._counters['hits'] += 1
+                    self._counters['memory_hits'] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute('SELECT stored_at, value FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[0], now):
+                        value = json.loads(row[1])
+                        self._remember(key, row[0], value)
+                        self._counters['hits'] += 1
+                        self._counters['disk_hits'] += 1
+                        return value
+                    self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+
+            self._counters['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        """Store ``value`` (must be JSON-serializable) under ``key`` in every tier."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._counters['writes'] += 1
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO results (key, stored_at, value) VALUES (?, ?, ?)',
+                    (key, now, json.dumps(value)),
+                )
+                # Trimming scans the stored_at index, so amortize it over many writes
+                if self._counters['writes'] % 100 == 1:
+                    self._trim_db(now)
+
+    def _remember(self, key, stored_at, value):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _trim_db(self, now):
+        if self.ttl > 0:
+            self._db.execute('DELETE FROM results WHERE stored_at < ?', (now - self.ttl,))
+        self._db.execute(
+            'DELETE FROM results WHERE key IN '
+            '(SELECT key FROM results ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+            (self.db_max_entries,),
+        )
+
+    def stats(self):
+        """Return hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['max_entries'] = self.max_entries
+            stats['ttl'] = self.ttl
+            if self._db is not None:
+                stats['disk_entries'] = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            return stats
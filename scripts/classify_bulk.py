@@ -0,0 +1,360 @@
+"""Classify large image collections offline, without Flask or Gemini.
+
+Sources can be directories (searched recursively), glob patterns, single images
+and .zip / .tar / .tar.gz archives, in any mix. Images are decoded by a pool of
+worker processes (JPEG draft mode, straight to 32x32 uint8) while the previous
+batch runs through the inference engine, and each batch is written to the output
+as soon as it is classified:
+
+- ``.csv`` / ``.jsonl``: one row per image, appended and flushed per batch;
+- ``.parquet``: a directory of part files (pyarrow needed), one row group per batch.
+
+With --pipeline, decoding and inference are split over processes instead (see
+pipeline.py): --workers decoder processes fill shared-memory batch buffers and a
+single inference process runs every full batch, so the model never competes with
+PIL for the GIL and gets large batches.
+
+Re-running the same command resumes: sources already present in the output
+(including undecodable ones, recorded with their error) are skipped, and a row
+cut off by an interruption is dropped and redone.
+
+Usage:
+    python scripts/classify_bulk.py SOURCE [SOURCE ...] --output results.csv
+                                    [--engine tflite] [--batch-size 256] [--workers 8] [--no-draft]
+                                    [--pipeline] [--ring-size 4]
+
+Example:
+    python scripts/classify_bulk.py crops/ 'more/**/*.jpg' dashcam-2024.tar.gz --output crops.jsonl
+"""
+import argparse
+import csv
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from io import BytesIO
+from itertools import islice
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+
+import config  # noqa: E402
+import inference  # noqa: E402
+import labels  # noqa: E402
+import pipeline  # noqa: E402
+import preprocessing  # noqa: E402
+
+COLUMNS = ('source', 'class_id', 'sign_name', 'confidence', 'error')
+ZIP_EXTENSIONS = ('.zip',)
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz')
+
+
+# ---------------------------------------------------------------- sources
+
+def iter_sources(sources, done):
+    """Yield (source, payload) for every image not in ``done``.
+
+    ``payload`` is a path for files on disk and the raw bytes for archive members,
+    which are keyed as ``archive:member``. Archives are read sequentially, so
+    compressed tarballs are never seeked or fully extracted. An image matched by
+    several sources is yielded once.
+    """
+    done = set(done)
+    for source in sources:
+        if os.path.isdir(source):
+            paths = preprocessing.find_images(source)
+        elif os.path.isfile(source):
+            paths = [source]
+        else:
+            paths = sorted(glob.glob(source, recursive=True))
+            if not paths:
+                print(f"⚠️  No files match {source}")
+        for path in paths:
+            name = path.lower()
+            if name.endswith(ZIP_EXTENSIONS):
+                yield from _zip_members(path, done)
+            elif name.endswith(TAR_EXTENSIONS):
+                yield from _tar_members(path, done)
+            elif name.endswith(preprocessing.IMAGE_EXTENSIONS) and path not in done:
+                done.add(path)
+                yield path, path
+
+
+def _zip_members(path, done):
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.infolist():
+            key = f"{path}:{member.filename}"
+            if not member.is_dir() and member.filename.lower().endswith(preprocessing.IMAGE_EXTENSIONS) \
+                    and key not in done:
+                done.add(key)
+                yield key, archive.read(member)
+
+
+def _tar_members(path, done):
+    with tarfile.open(path, mode='r|*') as archive:
+        for member in archive:
+            key = f"{path}:{member.name}"
+            if member.isfile() and member.name.lower().endswith(preprocessing.IMAGE_EXTENSIONS) \
+                    and key not in done:
+                done.add(key)
+                yield key, archive.extractfile(member).read()
+
+
+def decode(item, draft=True):
+    """Decode one (source, payload) into a 32x32x3 uint8 array (runs in the worker processes).
+
+    Returns:
+        tuple: (source, pixels or None, error message or None)
+    """
+    source, payload = item
+    try:
+        image_file = BytesIO(payload) if isinstance(payload, bytes) else payload
+        pixels = np.empty(pipeline.SLOT_SHAPE, dtype=np.uint8)
+        preprocessing.write_row(preprocessing.open_image(image_file, preprocessing.IMAGE_SIZE, draft), pixels)
+        return source, pixels, None
+    except Exception as e:
+        return source, None, str(e)
+
+
+def chunks(items, size):
+    """Yield lists of up to ``size`` items."""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---------------------------------------------------------------- outputs
+
+class _LineWriter:
+    """Shared resume logic for the line-oriented CSV and JSONL outputs."""
+
+    def __init__(self, path):
+        self.path = path
+        self._drop_partial_line()
+        self.done = self.read_done() if os.path.exists(path) else set()
+        self.file = open(path, 'a', newline='', encoding='utf-8')
+
+    def _drop_partial_line(self):
+        """Truncate a last row left unfinished by an interrupted run."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+                print(f"Dropped an incomplete last row from {self.path}")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(_LineWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS)
+        if self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def read_done(self):
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return {row['source'] for row in csv.DictReader(f)}
+
+    def write(self, records):
+        self.writer.writerows(records)
+        self.flush()
+
+
+class JsonlWriter(_LineWriter):
+    def read_done(self):
+        with open(self.path, encoding='utf-8') as f:
+            return {json.loads(line)['source'] for line in f if line.strip()}
+
+    def write(self, records):
+        self.file.writelines(json.dumps(record) + '\n' for record in records)
+        self.flush()
+
+
+class ParquetWriter:
+    """Part files in a directory; a new part every ``part_rows`` rows, so an interruption loses one part at most."""
+
+    def __init__(self, path, part_rows=100000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.part_rows = part_rows
+        self.schema = pa.schema([('source', pa.string()), ('class_id', pa.int32()), ('sign_name', pa.string()),
+                                 ('confidence', pa.float32()), ('error', pa.string())])
+        os.makedirs(path, exist_ok=True)
+        self.done = set()
+        parts = sorted(glob.glob(os.path.join(path, 'part-*.parquet')))
+        for part in parts:
+            try:
+                self.done.update(pq.read_table(part, columns=['source']).column('source').to_pylist())
+            except Exception as e:
+                # Written by an interrupted run (no footer); its images are classified again
+                print(f"Removing unreadable part {part}: {e}")
+                os.remove(part)
+        self.next_part = len(parts)
+        self.writer = None
+        self.rows = 0
+
+    def write(self, records):
+        if self.writer is None or self.rows >= self.part_rows:
+            self.close()
+            while os.path.exists(self._part_path()):
+                self.next_part += 1
+            self.writer = self.pq.ParquetWriter(self._part_path(), self.schema)
+            self.next_part += 1
+            self.rows = 0
+        self.writer.write_table(self.pa.Table.from_pylist(records, schema=self.schema))
+        self.rows += len(records)
+
+    def _part_path(self):
+        return os.path.join(self.path, f'part-{self.next_part:05d}.parquet')
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def open_writer(path, output_format=None):
+    output_format = output_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if output_format == 'csv':
+        return CsvWriter(path)
+    if output_format == 'jsonl':
+        return JsonlWriter(path)
+    if output_format == 'parquet':
+        return ParquetWriter(path)
+    raise ValueError(f"Unknown output format '{output_format}'. Use csv, jsonl or parquet.")
+
+
+# ---------------------------------------------------------------- classification
+
+def make_records(sources, rows, errors, probabilities, label_set):
+    """Build the output records of one batch: ``probabilities`` has a row per decoded source in ``rows``."""
+    records = [{'source': source, 'class_id': None, 'sign_name': None, 'confidence': None,
+                'error': errors.get(index)} for index, source in enumerate(sources)]
+    if len(rows):
+        predicted = np.argmax(probabilities, axis=1)
+        for row, index in enumerate(rows):
+            class_id = int(predicted[row])
+            records[index].update({'class_id': class_id, 'sign_name': label_set.name(class_id),
+                                   'confidence': round(float(probabilities[row, class_id]), 6)})
+    return records
+
+
+def classify(decoded, engine, label_set):
+    """Run one decoded chunk through the engine and return its output records, in input order."""
+    rows = [index for index, (_, pixels, _) in enumerate(decoded) if pixels is not None]
+    errors = {index: error for index, (_, _, error) in enumerate(decoded) if error is not None}
+    probabilities = None
+    if rows:
+        batch = preprocessing.empty_batch(len(rows))
+        for row, index in enumerate(rows):
+            batch[row] = decoded[index][1]
+        probabilities = engine.predict(preprocessing.normalize(batch), verbose=0)
+    return make_records([source for source, _, _ in decoded], rows, errors, probabilities, label_set)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='+', help='Directories, glob patterns, images or .zip/.tar(.gz) archives')
+    parser.add_argument('--output', required=True, help='results.csv, results.jsonl or a results.parquet directory')
+    parser.add_argument('--format', choices=('csv', 'jsonl', 'parquet'), help='Output format (default: from --output)')
+    parser.add_argument('--model', default=config.MODEL_PATH)
+    parser.add_argument('--engine', default=config.INFERENCE_ENGINE,
+                        choices=sorted(inference.ENGINE_EXTENSIONS), help='Inference engine (see INFERENCE_ENGINE)')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Decoding processes (0 = decode in this process)')
+    parser.add_argument('--no-draft', action='store_true', help='Decode JPEGs at full resolution')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Decode into shared memory and run the model in its own process (see pipeline.py)')
+    parser.add_argument('--ring-size', type=int, default=4, help='Batches in flight in --pipeline mode')
+    args = parser.parse_args()
+
+    writer = open_writer(args.output, args.format)
+    if writer.done:
+        print(f"Resuming: {len(writer.done)} images already in {args.output}")
+
+    label_set = labels.load_labels(labels.labels_path(args.model, config.SIGNNAME_CSV))
+    buckets = sorted(set(config.INFERENCE_BUCKETS) | {args.batch_size})
+    load_engine = functools.partial(inference.load_engine, args.model, args.engine, buckets,
+                                    config.INFERENCE_THREADS)
+    started = time.perf_counter()
+    written = failed = 0
+
+    def report():
+        elapsed = time.perf_counter() - started
+        print(f"{written} images ({failed} undecodable) in {elapsed:.1f}s, {written / max(elapsed, 1e-9):.0f} images/s")
+
+    def write(records):
+        nonlocal written, failed
+        writer.write(records)
+        written += len(records)
+        failed += sum(record['error'] is not None for record in records)
+
+    pool = None
+    try:
+        items = iter_sources(args.sources, writer.done)
+        if args.pipeline:
+            # The engine is loaded in the pipeline's inference process, not here
+            stages = pipeline.DecodePipeline(load_engine, args.batch_size, max(args.workers, 1), args.ring_size,
+                                             draft=not args.no_draft)
+            print(f"Pipeline: {stages.decoders} decoder processes, 1 inference process ({args.engine} engine), "
+                  f"{stages.ring_size} x {args.batch_size} shared-memory slots")
+            for number, (sources, rows, errors, probabilities) in enumerate(stages.run(items), 1):
+                write(make_records(sources, rows, errors, probabilities, label_set))
+                if number % 20 == 0:
+                    report()
+        else:
+            # Fork the decoders before the engine imports TensorFlow, which is not fork-safe
+            pool = multiprocessing.Pool(args.workers) if args.workers > 0 else None
+            engine = load_engine()
+            print(f"Loaded {args.model} ({args.engine} engine), {len(label_set)} classes")
+            decode_item = functools.partial(decode, draft=not args.no_draft)
+
+            # Double-buffered: the workers decode the next chunk while this one is classified and written
+            pending = None
+            for number, chunk in enumerate(chunks(items, args.batch_size)):
+                if pool is not None:
+                    in_flight = pool.map_async(decode_item, chunk, chunksize=max(1, len(chunk) // (4 * args.workers)))
+                else:
+                    in_flight = list(map(decode_item, chunk))
+                if pending is not None:
+                    write(classify(pending.get() if pool is not None else pending, engine, label_set))
+                    if number % 20 == 0:
+                        report()
+                pending = in_flight
+            if pending is not None:
+                write(classify(pending.get() if pool is not None else pending, engine, label_set))
+    except KeyboardInterrupt:
+        print("Interrupted - run the same command again to resume")
+        return 130
+    finally:
+        if pool is not None:
+            pool.terminate()
+        writer.close()
+        report()
+    print(f"✅ Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Export the Keras traffic-sign model to TFLite and/or ONNX for the lightweight CPU engines.
+
+The exported files are written next to the .h5 model (traffic-sign.tflite,
+traffic-sign.int8.tflite, traffic-sign.onnx), which is where INFERENCE_ENGINE=tflite /
+tflite_int8 / onnx looks for them. Every export keeps a dynamic batch dimension so
+the engines can run any bucket size. ONNX export needs the tf2onnx package.
+
+tflite_int8 is post-training full-integer quantization: weights and activations
+are int8, calibrated on a folder of representative sign images (--calibration-dir),
+while the model still takes float32 input and returns float32 probabilities.
+Compare it with the float32 model using benchmarks/quantization_report.py.
+
+Usage:
+    python scripts/export_model.py [--model traffic-sign.h5] [--format tflite|tflite_int8|onnx|all]
+                                   [--calibration-dir tests/] [--calibration-images 200] [--output-dir DIR]
+"""
+import argparse
+import os
+import sys
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+
+import config  # noqa: E402
+import inference  # noqa: E402
+import preprocessing  # noqa: E402
+
+
+def output_path(model_path, engine, output_dir=None):
+    """Return where the export for ``engine`` is written."""
+    path = inference.artifact_path(model_path, engine)
+    return os.path.join(output_dir, os.path.basename(path)) if output_dir else path
+
+
+def calibration_images(directory, limit):
+    """Return up to ``limit`` preprocessed images from ``directory`` as a float32 (N, 32, 32, 3) batch."""
+    paths = preprocessing.find_images(directory)[:limit]
+    if not paths:
+        raise FileNotFoundError(f"No calibration images (PNG/JPG) found in {directory}")
+    print(f"Calibrating int8 ranges on {len(paths)} images from {directory}")
+    batch, _, _ = preprocessing.load_batch(paths)
+    return batch
+
+
+def tflite_converter(keras_model):
+    """Return a TFLite converter for the model with a dynamic batch dimension."""
+    import tensorflow as tf
+
+    forward = tf.function(
+        lambda x: keras_model(x, training=False),
+        input_signature=[tf.TensorSpec(shape=(None,) + inference.INPUT_SHAPE, dtype=tf.float32)],
+    )
+    return tf.lite.TFLiteConverter.from_concrete_functions([forward.get_concrete_function()], keras_model)
+
+
+def export_tflite(keras_model, path, args):
+    """Convert the model to a float32 .tflite flatbuffer."""
+    converter = tflite_converter(keras_model)
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_tflite_int8(keras_model, path, args):
+    """Convert the model to a full-integer int8 .tflite flatbuffer with float32 input and output."""
+    import tensorflow as tf
+
+    images = calibration_images(args.calibration_dir, args.calibration_images)
+    converter = tflite_converter(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: ([image[np.newaxis]] for image in images)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_onnx(keras_model, path, args):
+    """Convert the model to ONNX with a dynamic batch dimension."""
+    import tensorflow as tf
+    import tf2onnx
+
+    signature = [tf.TensorSpec(shape=(None,) + inference.INPUT_SHAPE, dtype=tf.float32, name='image')]
+    tf2onnx.convert.from_keras(keras_model, input_signature=signature, opset=13, output_path=path)
+
+
+EXPORTERS = {
+    'tflite': export_tflite,
+    'tflite_int8': export_tflite_int8,
+    'onnx': export_onnx,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=config.MODEL_PATH, help='Keras .h5 model to export')
+    parser.add_argument('--format', choices=sorted(EXPORTERS) + ['all'], default='tflite')
+    parser.add_argument('--output-dir', default=None, help='Directory for the exports (default: next to the model)')
+    parser.add_argument('--calibration-dir', default=os.path.join(config.BASE_DIR, 'tests'),
+                        help='Representative sign images used to calibrate tflite_int8')
+    parser.add_argument('--calibration-images', type=int, default=200, help='Max calibration images')
+    args = parser.parse_args()
+
+    formats = sorted(EXPORTERS) if args.format == 'all' else [args.format]
+    keras_model = inference.load_keras_model(args.model)
+    for engine in formats:
+        path = output_path(args.model, engine, args.output_dir)
+        print(f"Exporting {args.model} to {path}...")
+        EXPORTERS[engine](keras_model, path, args)
+        print(f"✅ Wrote {path} ({os.path.getsize(path) / 1024:.1f} KiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
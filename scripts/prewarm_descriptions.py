@@ -0,0 +1,44 @@
+"""Prewarm the per-class description store so /predict rarely needs a Gemini analysis call.
+
+Generates a Gemini description for every class in signname.csv that has no entry
+yet (or whose entry is older than --max-age days, or all of them with --force) and
+writes them to the store file used by the app (DESCRIPTION_STORE_PATH).
+
+Usage:
+    python scripts/prewarm_descriptions.py [--force] [--max-age DAYS] [--store class_descriptions.json]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store', default=config.DESCRIPTION_STORE_PATH, help='Description store JSON file')
+    parser.add_argument('--force', action='store_true', help='Regenerate every class')
+    parser.add_argument('--max-age', type=float, default=None, help='Regenerate entries older than this many days')
+    args = parser.parse_args()
+
+    # Point the app at the requested store before importing it
+    config.DESCRIPTION_STORE_PATH = args.store
+    config.DESCRIPTION_STORE_ENABLED = True
+    config.DESCRIPTION_REFRESH_INTERVAL = 0
+    import app
+
+    store = app.description_store
+    class_names = app.get_class_names()
+    max_age = 1e-9 if args.force else (args.max_age * 86400 if args.max_age else None)
+    todo = store.missing_or_stale(class_names, max_age)
+    print(f"{len(class_names) - len(todo)} of {len(class_names)} classes already stored; generating {len(todo)}")
+
+    written = store.refresh(class_names, app.generate_class_description, max_age)
+    print(f"✅ Wrote {written} descriptions to {args.store}")
+    return 0 if written == len(todo) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
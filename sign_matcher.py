@@ -0,0 +1,204 @@
+"""Map free-text sign names (e.g. Gemini's ``predicted_sign``) to model class ids.
+
+``compare_predictions`` used to lowercase both names and test substrings and word
+overlap on every request, and Gemini's answer was never tied back to a class.
+``SignMatcher`` precomputes, for every class, the normalized tokens and character
+trigrams of its name and a few common aliases ("give way" for Yield, "road works"
+for Road work, ...), plus an inverted token -> classes index. A query is scored
+only against the classes sharing a token with it:
+
+    score = 0.5 * token Dice + 0.5 * trigram Dice   (halved if the numbers differ)
+
+so "Speed limit 30 km/h" matches class 1 and not class 2. Exact names and aliases
+score 1.0. An answer that fits several classes about equally well ("Speed limit
+sign", "Dangerous curve") is ambiguous and matches none: the best class must beat
+the runner-up by ``min_margin``. Results are memoized, since Gemini's answers
+repeat a lot.
+
+``words_overlap`` is the original substring / shared-words test, kept for answers
+the matcher cannot pin to one class.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+DEFAULT_MIN_SCORE = 0.6
+DEFAULT_MIN_MARGIN = 0.05
+
+# Extra names for classes (by sign name); matched exactly and used for fuzzy scoring
+ALIASES = {
+    'No passing': ('no overtaking',),
+    'Priority road': ('main road', 'priority'),
+    'Yield': ('give way',),
+    'Stop': ('stop sign',),
+    'No vehicles': ('no vehicles allowed', 'closed to all vehicles'),
+    'No entry': ('do not enter', 'no entry for vehicles'),
+    'General caution': ('caution', 'danger', 'warning', 'exclamation mark'),
+    'Bumpy road': ('uneven road', 'speed bump'),
+    'Road narrows on the right': ('road narrows',),
+    'Road work': ('road works', 'roadworks', 'construction'),
+    'Traffic signals': ('traffic light', 'traffic lights'),
+    'Pedestrians': ('pedestrian crossing',),
+    'Children crossing': ('school zone', 'children'),
+    'Bicycles crossing': ('bicycle crossing', 'cyclists'),
+    'Beware of ice/snow': ('ice', 'snow', 'icy road'),
+    'Wild animals crossing': ('animal crossing', 'deer crossing'),
+    'Ahead only': ('straight ahead only',),
+    'Roundabout mandatory': ('roundabout',),
+}
+
+STOP_WORDS = frozenset({'a', 'an', 'the', 'of', 'at', 'to', 'for', 'by', 'on', 'sign', 'signs'})
+_TOKEN_RE = re.compile(r'\d+(?:\.\d+)?|[a-z]+')
+_SPEED_RE = re.compile(r'(\d+)\s*km\s*/?\s*h\b')
+
+
+def tokenize(text):
+    """Return the normalized tokens of a sign name ("Speed limit (30km/h)" -> ('speed', 'limit', '30'))."""
+    text = _SPEED_RE.sub(r'\1', text.lower())
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]  # crude singular: "pedestrians" ~ "pedestrian"
+        tokens.append(token)
+    return tuple(tokens)
+
+
+def words_overlap(name, other):
+    """Whether two sign names contain one another or share at least two words (case-insensitive)."""
+    name, other = name.lower().strip(), other.lower().strip()
+    if not name or not other:
+        return False
+    if name in other or other in name:
+        return True
+    return len(set(name.split()) & set(other.split())) >= 2
+
+
+def trigrams(tokens):
+    """Return the multiset of character trigrams of the joined, space-padded tokens."""
+    text = f"  {' '.join(tokens)} "
+    return Counter(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def _dice(a, b, size_a, size_b):
+    return 2.0 * a / (size_a + size_b) if size_a + size_b else 0.0
+
+
+class _Form:
+    """One precomputed surface form (name or alias) of a class."""
+
+    __slots__ = ('class_id', 'key', 'tokens', 'numbers', 'trigrams', 'trigram_count')
+
+    def __init__(self, class_id, text):
+        self.class_id = class_id
+        self.tokens = frozenset(tokenize(text))
+        self.key = ' '.join(sorted(self.tokens))
+        self.numbers = frozenset(token for token in self.tokens if token[0].isdigit())
+        self.trigrams = trigrams(sorted(self.tokens))
+        self.trigram_count = sum(self.trigrams.values())
+
+
+class SignMatcher:
+    """Precomputed token/alias index and fuzzy scorer over a LabelSet."""
+
+    def __init__(self, label_set, aliases=ALIASES, min_score=DEFAULT_MIN_SCORE, min_margin=DEFAULT_MIN_MARGIN,
+                 cache_size=4096):
+        """
+        Args:
+            label_set: labels.LabelSet whose class ids are returned
+            aliases: {sign name: (alias, ...)}; names not in the label set are ignored
+            min_score: Best scores below this are reported as no match
+            min_margin: Fuzzy matches must beat the best other class by this much (ties are no match)
+            cache_size: Memoized queries
+        """
+        self.label_set = label_set
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.forms = [_Form(class_id, name) for class_id, name in enumerate(label_set.names)]
+        for name, names in aliases.items():
+            class_id = label_set.by_name.get(name)
+            if class_id is not None:
+                self.forms.extend(_Form(class_id, alias) for alias in names)
+
+        self.exact = {}
+        self.token_index = {}
+        for form in self.forms:
+            self.exact.setdefault(form.key, form.class_id)
+            for token in form.tokens:
+                self.token_index.setdefault(token, []).append(form)
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def score(self, query_tokens, query_trigrams, form):
+        """Similarity in [0, 1] between a tokenized query and one form."""
+        shared_tokens = len(query_tokens & form.tokens)
+        token_score = _dice(shared_tokens, shared_tokens, len(query_tokens), len(form.tokens))
+        shared_trigrams = sum((query_trigrams & form.trigrams).values())
+        trigram_score = _dice(shared_trigrams, shared_trigrams, sum(query_trigrams.values()), form.trigram_count)
+        score = 0.5 * token_score + 0.5 * trigram_score
+        query_numbers = frozenset(token for token in query_tokens if token[0].isdigit())
+        if query_numbers and form.numbers and query_numbers != form.numbers:
+            score *= 0.5
+        return score
+
+    def _match(self, text):
+        """Return (class_id, score) for the best matching class.
+
+        The class is None (with the best score) when that score is below min_score or
+        another class scores within min_margin of it.
+        """
+        query_tokens = frozenset(tokenize(text or ''))
+        if not query_tokens:
+            return None, 0.0
+        class_id = self.exact.get(' '.join(sorted(query_tokens)))
+        if class_id is not None:
+            return class_id, 1.0
+
+        # Only forms sharing a token can score well; fall back to all of them for typos
+        candidates = {id(form): form for token in query_tokens for form in self.token_index.get(token, ())}
+        forms = candidates.values() or self.forms
+        query_trigrams = trigrams(sorted(query_tokens))
+        class_scores = {}
+        for form in forms:
+            score = self.score(query_tokens, query_trigrams, form)
+            if score > class_scores.get(form.class_id, 0.0):
+                class_scores[form.class_id] = score
+        ranked = sorted(class_scores.items(), key=lambda item: item[1], reverse=True)
+        best_class, best_score = ranked[0] if ranked else (None, 0.0)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best_score < self.min_score or best_score - runner_up < self.min_margin:
+            return None, round(best_score, 4)
+        return best_class, round(best_score, 4)
+
+    def agreement(self, cnn_class_ids, answers):
+        """Summarize how often free-text answers agree with CNN classes.
+
+        Args:
+            cnn_class_ids: CNN class ids
+            answers: Free-text answers (e.g. Gemini's predicted_sign), same order
+
+        Returns:
+            dict: total, matched (answers mapped to a class), agreed, agreement_rate
+                (agreed / matched) and per-class {class_id: [agreed, total]}
+        """
+        total = matched = agreed = 0
+        per_class = {}
+        for cnn_class, answer in zip(cnn_class_ids, answers):
+            cnn_class = int(cnn_class)
+            answer_class, _ = self.match(answer)
+            counts = per_class.setdefault(cnn_class, [0, 0])
+            counts[1] += 1
+            total += 1
+            if answer_class is None:
+                continue
+            matched += 1
+            if answer_class == cnn_class:
+                agreed += 1
+                counts[0] += 1
+        return {
+            'total': total,
+            'matched': matched,
+            'agreed': agreed,
+            'agreement_rate': round(agreed / matched, 4) if matched else None,
+            'per_class': per_class,
+        }
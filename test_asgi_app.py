@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+ASGI routes (asgi_app.py) through Starlette's TestClient: /predict, /predict?stream=1 and /predict_batch
+
+Runs offline: the CNN is replaced by a fixed-output engine and Gemini by a stub
+model factory, so neither traffic-sign.h5 nor an API key is needed.
+"""
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+
+import numpy as np
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+
+_workdir = tempfile.mkdtemp(prefix='test-asgi-')
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('DESCRIPTION_STORE_PATH', os.path.join(_workdir, 'class_descriptions.json'))
+os.environ.setdefault('RESULT_CACHE_DB', '')
+
+from starlette.testclient import TestClient  # noqa: E402
+
+import app as flask_app  # noqa: E402
+import asgi_app  # noqa: E402
+import gemini_client  # noqa: E402
+import preprocessing  # noqa: E402
+
+TEST_IMAGES = preprocessing.find_images(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests'))
+PREDICTED_CLASS = 1
+SIGN_NAME = flask_app.get_sign_name(PREDICTED_CLASS)
+
+
+class FixedEngine:
+    """Stands in for the CNN: every image gets the same, uncertain prediction (so Gemini is asked)."""
+
+    def predict(self, batch, verbose=0):
+        probabilities = np.full((len(batch), len(flask_app.sign_labels)), 0.01, dtype=np.float32)
+        probabilities[:, PREDICTED_CLASS] = 0.6
+        return probabilities
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGemini:
+    """Agrees with the CNN; analysis prompts get a fixed text."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, contents, stream=False):
+        prompt = contents[0] if isinstance(contents, (list, tuple)) else contents
+        if 'SIGN_TYPE:' in prompt:
+            text = f"SIGN_TYPE: {SIGN_NAME}\nCONFIDENCE: High\nEXPLANATION: Stub."
+        else:
+            text = "**Sign Meaning:** Stub analysis."
+        return iter([_Response(text)]) if stream else _Response(text)
+
+
+@pytest.fixture(scope='module')
+def client():
+    flask_app.model = FixedEngine()
+    gemini_client.model_factory = StubGemini
+    with TestClient(asgi_app.app) as test_client:
+        yield test_client
+
+
+def image_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.skipif(not TEST_IMAGES, reason='no images in tests/')
+def test_predict(client):
+    response = client.post('/predict', data={'no_cache': '1'},
+                           files={'file': ('sign.jpg', image_bytes(TEST_IMAGES[0]), 'image/jpeg')})
+    result = response.json()
+    assert result['success'], result
+    assert result['predicted_class'] == PREDICTED_CLASS
+
+
+@pytest.mark.skipif(not TEST_IMAGES, reason='no images in tests/')
+def test_ready_after_lazy_load(client, monkeypatch):
+    # Eager warm-up failed: not ready until a prediction succeeds with the lazily loaded model
+    monkeypatch.setattr(flask_app.config, 'EAGER_LOAD_MODEL', True)
+    monkeypatch.setitem(flask_app.startup, 'warm', False)
+    assert client.get('/ready').status_code == 503
+    client.post('/predict', data={'no_cache': '1'},
+                files={'file': ('sign.jpg', image_bytes(TEST_IMAGES[0]), 'image/jpeg')})
+    assert client.get('/ready').status_code == 200
+
+
+def test_predict_rejects_non_images(client):
+    response = client.post('/predict', files={'file': ('sign.jpg', b'not an image', 'image/jpeg')})
+    assert response.json() == {'success': False, 'error': 'Invalid file type. Use PNG, JPG, or JPEG.'}
+
+
+@pytest.mark.parametrize('data, error', [
+    (b'\xff\xd8\xff' + b'junk' * 16, 'Cannot read JPEG image.'),
+    (b'\x89PNG\r\n\x1a\n' + b'\0' * 64, 'Cannot read PNG image.'),
+])
+def test_predict_rejects_unreadable_images(client, data, error):
+    response = client.post('/predict', data={'no_cache': '1'}, files={'file': ('sign.jpg', data, 'image/jpeg')})
+    assert response.json() == {'success': False, 'error': error}
+
+
+@pytest.mark.skipif(not TEST_IMAGES, reason='no images in tests/')
+def test_predict_url_mode_checks_pixels_first(client, monkeypatch):
+    monkeypatch.setattr(flask_app.config, 'UPLOAD_MAX_PIXELS', 100)
+    response = client.post('/predict', data={'no_cache': '1', 'image': 'url'},
+                           files={'file': ('sign.jpg', image_bytes(TEST_IMAGES[0]), 'image/jpeg')})
+    result = response.json()
+    assert not result['success']
+    assert result['error'].startswith('Image too large')
+
+
+@pytest.mark.skipif(not TEST_IMAGES, reason='no images in tests/')
+def test_predict_stream(client):
+    response = client.post('/predict?stream=1', data={'no_cache': '1'},
+                           files={'file': ('sign.jpg', image_bytes(TEST_IMAGES[0]), 'image/jpeg')})
+    assert response.headers['content-type'].startswith(flask_app.STREAM_MIMETYPE)
+    events = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+    assert events[0]['event'] == 'classification'
+    assert events[-1]['event'] == 'result', events[-1]
+    assert events[-1]['predicted_class'] == PREDICTED_CLASS
+
+
+@pytest.mark.skipif(not TEST_IMAGES, reason='no images in tests/')
+def test_predict_batch(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_file:
+        zip_file.writestr('in-zip.png', image_bytes(TEST_IMAGES[-1]))
+    tar_archive = io.BytesIO()
+    with tarfile.open(fileobj=tar_archive, mode='w') as tar_file:
+        data = image_bytes(TEST_IMAGES[0])
+        member = tarfile.TarInfo('in-tar.jpg')
+        member.size = len(data)
+        tar_file.addfile(member, io.BytesIO(data))
+
+    files = [('files', (os.path.basename(path), image_bytes(path), 'application/octet-stream')) for path in TEST_IMAGES]
+    files.append(('files', ('images.zip', archive.getvalue(), 'application/zip')))
+    files.append(('files', ('images.tar', tar_archive.getvalue(), 'application/x-tar')))
+    files.append(('files', ('broken.png', b'\x89PNG\r\n\x1a\nbroken', 'image/png')))
+    result = client.post('/predict_batch', files=files).json()
+
+    assert result['success'], result
+    names = [entry['filename'] for entry in result['results']]
+    assert names == [os.path.basename(path) for path in TEST_IMAGES] + ['in-zip.png', 'in-tar.jpg', 'broken.png']
+    for entry in result['results'][:-1]:
+        assert entry['success'], entry
+        assert entry['predicted_class'] == PREDICTED_CLASS
+    assert not result['results'][-1]['success']
+    assert result['results'][-1]['error'].startswith("Cannot decode 'broken.png'")
+
+
+def test_predict_batch_archive_limits(client, monkeypatch):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr('bomb.png', b'\0' * 4096)
+        zip_file.writestr('notes.txt', b'')
+    files = [('files', ('images.zip', archive.getvalue(), 'application/zip'))]
+
+    monkeypatch.setattr(flask_app.config, 'ARCHIVE_MAX_MEMBER_BYTES', 1024)
+    result = client.post('/predict_batch', files=files).json()
+    assert not result['success']
+    assert "'bomb.png' in 'images.zip' is too large" in result['error']
+
+    monkeypatch.setattr(flask_app.config, 'ARCHIVE_MAX_MEMBER_BYTES', 1 << 20)
+    monkeypatch.setattr(flask_app.config, 'ARCHIVE_MAX_MEMBERS', 1)
+    result = client.post('/predict_batch', files=files).json()
+    assert not result['success']
+    assert result['error'].startswith("Too many entries in 'images.zip'")
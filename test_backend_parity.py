@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Parity check: exported TFLite / ONNX engines against the Keras model on the images in tests/
+
+Run as a script (python test_backend_parity.py [engine ...]) or under pytest, which
+skips engines whose exported file, the Keras model or the tests/ images are missing.
+"""
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import sys
+import numpy as np
+import pytest
+
+import inference
+import preprocessing
+
+MODEL_PATH = "traffic-sign.h5"
+TEST_IMAGES = preprocessing.find_images("tests")
+MAX_PROBABILITY_DELTA = 1e-4
+ENGINES = ['tflite', 'onnx']
+
+
+def check_backend_parity(engine_name, batch, reference):
+    """Compare one engine's top-1 and probabilities with the Keras reference"""
+    print(f"\nEngine: {engine_name}")
+    engine = inference.load_engine(MODEL_PATH, engine_name)
+    probabilities = engine.predict(batch)
+
+    top1_match = np.argmax(probabilities, axis=1) == np.argmax(reference, axis=1)
+    max_delta = float(np.abs(probabilities - reference).max())
+    print(f"   Top-1 agreement: {int(top1_match.sum())}/{len(batch)}")
+    print(f"   Max probability delta: {max_delta:.2e}")
+
+    ok = bool(top1_match.all()) and max_delta <= MAX_PROBABILITY_DELTA
+    print(f"   {'✅ Parity OK' if ok else '❌ Parity FAILED'}")
+    return ok
+
+
+@pytest.mark.parametrize('engine_name', ENGINES)
+def test_backend_parity(engine_name):
+    if not TEST_IMAGES:
+        pytest.skip("no test images in tests/")
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip(f"{MODEL_PATH} not found")
+    if not os.path.exists(inference.artifact_path(MODEL_PATH, engine_name)):
+        pytest.skip(f"{engine_name} export not found (python scripts/export_model.py --format {engine_name})")
+
+    batch, _, _ = preprocessing.load_batch(TEST_IMAGES)
+    reference = inference.load_keras_model(MODEL_PATH).predict(batch, verbose=0)
+    assert check_backend_parity(engine_name, batch, reference)
+
+
+if __name__ == "__main__":
+    engines = sys.argv[1:] or ENGINES
+    if not TEST_IMAGES:
+        print("No test images found in tests/!")
+        sys.exit(1)
+
+    batch, _, _ = preprocessing.load_batch(TEST_IMAGES)
+    reference = inference.load_keras_model(MODEL_PATH).predict(batch, verbose=0)
+    print(f"Keras reference on {len(TEST_IMAGES)} images: classes {np.argmax(reference, axis=1).tolist()}")
+
+    results = []
+    for engine_name in engines:
+        if not os.path.exists(inference.artifact_path(MODEL_PATH, engine_name)):
+            print(f"\nEngine: {engine_name}\n   ⚠️  Skipped - export it with: python scripts/export_model.py --format {engine_name}")
+            continue
+        results.append(check_backend_parity(engine_name, batch, reference))
+
+    sys.exit(0 if all(results) else 1)
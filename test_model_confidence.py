@@ -10,6 +10,8 @@ import numpy as np
 from PIL import Image
 import sys
 
+import preprocessing
+
 def test_model_predictions(model_path, image_path):
     """Test model predictions and analyze confidence values"""
     
@@ -36,18 +38,13 @@ def test_model_predictions(model_path, image_path):
     image = Image.open(image_path).convert("RGB")
     print(f"   Original size: {image.size}")
     
-    image_resized = image.resize((32, 32))
-    image_array = np.expand_dims(np.array(image_resized), axis=0)
+    # Same preprocessing as the app: 32x32, float32 in [0, 1]
+    image_array_normalized = np.expand_dims(preprocessing.load_image(image_path), axis=0)
+    image_array = image_array_normalized * 255.0
     print(f"   Input array shape: {image_array.shape}")
     print(f"   Input array dtype: {image_array.dtype}")
     print(f"   Input array range: [{image_array.min()}, {image_array.max()}]")
-    
-    # Normalize if needed (most models expect 0-1 range)
-    if image_array.max() > 1.0:
-        image_array_normalized = image_array.astype('float32') / 255.0
-        print(f"   Normalized range: [{image_array_normalized.min():.3f}, {image_array_normalized.max():.3f}]")
-    else:
-        image_array_normalized = image_array
+    print(f"   Normalized range: [{image_array_normalized.min():.3f}, {image_array_normalized.max():.3f}]")
     
     # Make predictions with both normalized and non-normalized inputs
     print(f"\n{'='*60}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+SignMatcher on exact, fuzzy and ambiguous Gemini answers, and compare_predictions on top of it
+"""
+import os
+import tempfile
+
+import pytest
+
+# Set before config is first imported (pytest may import this file before test_asgi_app.py)
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('DESCRIPTION_STORE_PATH', os.path.join(tempfile.mkdtemp(prefix='test-matcher-'),
+                                                             'class_descriptions.json'))
+os.environ.setdefault('RESULT_CACHE_DB', '')
+
+import config  # noqa: E402
+import labels  # noqa: E402
+from sign_matcher import SignMatcher, words_overlap  # noqa: E402
+
+sign_labels = labels.load_labels(labels.labels_path(config.MODEL_PATH, config.SIGNNAME_CSV))
+matcher = SignMatcher(sign_labels)
+
+
+@pytest.mark.parametrize('answer, sign_name', [
+    ('Speed limit (30km/h)', 'Speed limit (30km/h)'),
+    ('Speed limit 30 km/h', 'Speed limit (30km/h)'),
+    ('give way', 'Yield'),
+    ('Stop sign', 'Stop'),
+    ('End of speed limit', 'End of speed limit (80km/h)'),
+])
+def test_match(answer, sign_name):
+    class_id, score = matcher.match(answer)
+    assert class_id is not None and sign_labels.name(class_id) == sign_name, (answer, class_id, score)
+
+
+@pytest.mark.parametrize('answer', [
+    'Speed limit sign',  # every speed limit scores the same
+    'Dangerous curve',  # left and right within the margin
+    'No passing for large vehicles',
+])
+def test_ambiguous_answers_match_no_class(answer):
+    class_id, score = matcher.match(answer)
+    assert class_id is None, (answer, sign_labels.name(class_id), score)
+    assert score >= matcher.min_score
+
+
+def test_words_overlap():
+    assert words_overlap('Speed limit (30km/h)', 'Speed limit sign')
+    assert words_overlap('Dangerous curve to the right', 'dangerous curve')
+    assert not words_overlap('Stop', 'Yield')
+    assert not words_overlap('Stop', '')
+
+
+@pytest.fixture(scope='module')
+def compare_predictions():
+    pytest.importorskip('flask')
+    import app
+    return app.compare_predictions
+
+
+@pytest.mark.parametrize('cnn_sign, answer', [
+    ('Speed limit (30km/h)', 'Speed limit sign'),
+    ('Dangerous curve to the right', 'Dangerous curve'),
+    ('Speed limit (30km/h)', 'Speed limit 30 km/h'),
+])
+def test_ambiguous_answer_verifies_consistent_cnn(compare_predictions, cnn_sign, answer):
+    result = compare_predictions(cnn_sign, 0.7, {'predicted_sign': answer, 'confidence_level': 'High'})
+    assert result['verification'] == 'VERIFIED', result
+    assert result['final_sign'] == cnn_sign
+
+
+def test_specific_answer_corrects_cnn(compare_predictions):
+    result = compare_predictions('Speed limit (30km/h)', 0.7,
+                                 {'predicted_sign': 'Speed limit 50 km/h', 'confidence_level': 'High'})
+    assert result['verification'] == 'CORRECTED', result
+    assert result['final_sign'] == 'Speed limit (50km/h)'